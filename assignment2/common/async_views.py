@@ -0,0 +1,77 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.urls import resolve
+
+from common.instrumentation import instrument_connections, query_metrics
+
+# ASGI(waffle_backend/asgi.py)로 띄웠을 때 읽기 엔드포인트를 받는 async view.
+# Django 3.2 의 ORM 은 동기 코드뿐이고, ASGI 에서 동기 view 는 요청마다 하나뿐인 스레드(thread_sensitive)로 넘어가 차례로 실행됩니다.
+# 그래서 읽기 요청은 WSGI 와 같은 DRF view 를 ASYNC_DB_THREADS 개의 스레드에서 나눠 돌리고,
+# 느린 클라이언트를 기다리는 동안에는 스레드를 잡지 않도록 이벤트 루프에 맡깁니다. DB 커넥션도 이 스레드 수를 넘지 않습니다.
+# 어느 경로를 여기로 보낼지는 waffle_backend/asgi_urls.py 에 적어둡니다.
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+db_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix='async-db')
+
+
+def _call_in_db_thread(func, args, kwargs):
+    if query_metrics.get() is not None:
+        # 쿼리 계측 중인 요청이면 이 스레드의 쿼리도 요청의 QueryMetrics 로 셉니다. (common/instrumentation.py 참고)
+        instrument_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # 요청이 끝날 때 request_finished 가 하는 일을 이 스레드의 커넥션에도 해줍니다. (CONN_MAX_AGE 를 따릅니다.)
+        close_old_connections()
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # 어느 DB 를 읽을지(common/db_router.py), 쿼리를 어디에 셀지 같은 요청의 contextvar 를 그대로 가져갑니다.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        db_executor, context.run, functools.partial(_call_in_db_thread, func, args, kwargs)
+    )
+
+
+def detach(response):
+    # 이벤트 루프로 돌아간 뒤에는 DB 를 읽을 수 없으므로, 본문까지 다 만든 HttpResponse 로 바꿔 돌려줍니다.
+    # DRF Response 는 여기서 렌더링하고, 스트리밍 응답은 Django 3.2 의 ASGIHandler 가 본문을 이벤트 루프에서 읽기 때문에 미리 읽어둡니다.
+    if getattr(response, 'streaming', False):
+        content = b''.join(response.streaming_content)
+    elif callable(getattr(response, 'render', None)):
+        content = response.render().content
+    else:
+        return response
+
+    detached = HttpResponse(content, status=response.status_code)
+    for header, value in response.items():
+        detached[header] = value
+    detached.cookies = response.cookies
+    return detached
+
+
+def _call_view(view, request, args, kwargs):
+    return detach(view(request, *args, **kwargs))
+
+
+async def async_read_view(request, *args, **kwargs):
+    # ROOT_URLCONF 에서 같은 경로의 view 를 찾아, 읽기 요청이면 db_executor 에서 실행합니다.
+    # 쓰기 요청은 트랜잭션과 순서를 지금과 같게 두기 위해 Django 가 동기 view 를 실행하는 방식 그대로 넘깁니다.
+    match = resolve(request.path_info, urlconf=settings.ROOT_URLCONF)
+    request.resolver_match = match
+    if request.method in READ_METHODS:
+        return await run_in_db_thread(_call_view, match.func, request, match.args, match.kwargs)
+    return await sync_to_async(match.func, thread_sensitive=True)(request, *match.args, **match.kwargs)
+
+
+# CsrfViewMiddleware 는 찾은 view 의 csrf_exempt 를 보므로, 감싸진 DRF view 들처럼 표시해둡니다.
+async_read_view.csrf_exempt = True
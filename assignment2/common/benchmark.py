@@ -0,0 +1,526 @@
+import asyncio
+import contextlib
+import io
+import itertools
+import math
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from common.middleware import QueryMetrics
+from seminar.models import InstructorProfile, ParticipantProfile, Seminar, UserSeminar
+from seminar.tests import SeminarFactory
+from survey.models import OperatingSystem, SurveyResult
+from survey.statistics import rebuild_statistics
+from user.last_login import last_login_buffer
+from user.models import User
+from user.serializers import jwt_token_of
+from user.test_user import UserFactory
+
+# API 성능 벤치마크. (python manage.py benchmark 참고)
+# 정해진 크기의 데이터를 seed 로 재현 가능하게 채운 뒤, waffle_backend/urls.py 의 엔드포인트를 테스트 클라이언트로 호출해
+# 엔드포인트마다 지연 시간(p50/p95/p99), 쿼리 수, 최대 메모리를 JSON 으로 돌려줍니다.
+
+DEFAULT_SIZES = {'users': 10000, 'seminars': 1000, 'surveys': 1000000}
+PASSWORD = 'benchmark'
+INSTRUCTOR_EVERY = 10  # 유저 열 명 중 한 명은 강사, 나머지는 수강생입니다.
+PARTICIPANTS_PER_SEMINAR = 5
+BULK_SIZE = 20  # 일괄 가입, 일괄 수강 등록 한 번에 넣는 인원
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+@contextlib.contextmanager
+def benchmark_database():
+    # 개발 DB 를 건드리지 않도록 테스트 러너처럼 benchmark_<DB 이름> 으로 DB 를 새로 만들고, 끝나면 지웁니다.
+    settings_dict = connection.settings_dict
+    name = str(settings_dict['NAME'])
+    settings_dict['TEST']['NAME'] = os.path.join(os.path.dirname(name), f'benchmark_{os.path.basename(name)}')
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    # 새 DB 는 id 가 1 부터 다시 시작하므로 운영 캐시(redis)에 남은 세미나, 유저 등을 쓰면 안 되고, 그 캐시를 비워서도 안 됩니다.
+    # 벤치마크 동안에는 이 프로세스만 쓰는 빈 캐시로 바꿔서 재고, 끝나면 그 캐시만 비웁니다.
+    benchmark_cache = override_settings(CACHES=BENCHMARK_CACHES)
+    benchmark_cache.enable()
+    cache.clear()
+    try:
+        yield
+    finally:
+        # 로그인 시각은 모아두었다가 반영하므로, DB 를 지우기 전에 마저 반영합니다.
+        last_login_buffer.flush()
+        cache.clear()
+        benchmark_cache.disable()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed(users, seminars, surveys, seed=0, batch_size=5000):
+    # 비밀번호 해시는 한 번만 계산해 모든 유저가 같이 씁니다. (로그인 엔드포인트도 잴 수 있도록)
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+
+    User.objects.bulk_create(
+        (UserFactory.build(email=f'user{i}@benchmark.com', username=f'user{i}', password=password)
+         for i in range(users)),
+        batch_size=batch_size,
+    )
+    user_ids = list(User.objects.filter(email__endswith='@benchmark.com').order_by('id').values_list('id', flat=True))
+    instructor_ids = user_ids[::INSTRUCTOR_EVERY]
+    participant_ids = [user_id for i, user_id in enumerate(user_ids) if i % INSTRUCTOR_EVERY]
+    InstructorProfile.objects.bulk_create((InstructorProfile(user_id=user_id, company='와플스튜디오', year=1)
+                                           for user_id in instructor_ids), batch_size=batch_size)
+    ParticipantProfile.objects.bulk_create((ParticipantProfile(user_id=user_id, university='서울대학교')
+                                            for user_id in participant_ids), batch_size=batch_size)
+
+    Seminar.objects.bulk_create(
+        (SeminarFactory.build(name=f'세미나{i}', capacity=rng.randint(10, 100), count=PARTICIPANTS_PER_SEMINAR,
+                              time=f'{rng.randint(9, 21)}:00', online=rng.random() < 0.5)
+         for i in range(seminars)),
+        batch_size=batch_size,
+    )
+    seminar_ids = list(Seminar.objects.order_by('id').values_list('id', flat=True))
+    user_seminars = []
+    for i, seminar_id in enumerate(seminar_ids):
+        if instructor_ids:
+            user_seminars.append(UserSeminar(seminar_id=seminar_id, user_id=instructor_ids[i % len(instructor_ids)],
+                                             is_instructor=True))
+        user_seminars += [UserSeminar(seminar_id=seminar_id, user_id=user_id)
+                          for user_id in rng.sample(participant_ids, min(PARTICIPANTS_PER_SEMINAR, len(participant_ids)))]
+    UserSeminar.objects.bulk_create(user_seminars, batch_size=batch_size)
+    Seminar.objects.update(count=min(PARTICIPANTS_PER_SEMINAR, len(participant_ids)))
+
+    oses = [OperatingSystem.objects.get_or_create(name=name, defaults={'price': price})[0]
+            for name, price in (('Windows', 200000), ('MacOS', 300000), ('Ubuntu (Linux)', 0))]
+    majors = ('컴퓨터공학부', '타 전공', '경영학과', '수리과학부')
+    grades = ('1학년', '2학년', '3학년', '4학년')
+    start = timezone.now() - timedelta(days=365)
+    rows = (SurveyResult(os=rng.choice(oses), python=rng.randint(1, 5), rdb=rng.randint(1, 5),
+                         programming=rng.randint(1, 5), major=rng.choice(majors), grade=rng.choice(grades),
+                         backend_reason='재밌어서', waffle_reason='', say_something='',
+                         user_id=rng.choice(user_ids) if user_ids and rng.random() < 0.1 else None)
+            for _ in range(surveys))
+    while batch := list(itertools.islice(rows, batch_size)):
+        SurveyResult.objects.bulk_create(batch)
+    # timestamp 는 auto_now_add 라 bulk_create 로는 정할 수 없으므로 id 순서대로 1년에 걸쳐 펼쳐둡니다.
+    first = SurveyResult.objects.order_by('id').values_list('id', flat=True).first()
+    if surveys:
+        for low in range(first, first + surveys, batch_size):
+            SurveyResult.objects.filter(id__gte=low, id__lt=low + batch_size).update(
+                timestamp=start + timedelta(seconds=365 * 24 * 3600 * (low - first) / surveys))
+    rebuild_statistics()
+
+    staff = UserFactory.build(email='staff@benchmark.org', username='staff', password=password, is_staff=True)
+    staff.save()
+    # 수강 신청/드랍을 잴 정원이 넉넉한 세미나
+    big = SeminarFactory(name='벤치마크', capacity=10 ** 9, time='12:00')
+    if instructor_ids:
+        UserSeminar.objects.create(seminar=big, user_id=instructor_ids[0], is_instructor=True)
+
+    return {
+        'staff': staff,
+        'instructor': User.objects.filter(id__in=instructor_ids[:1]).first(),
+        'participants': participant_ids,
+        'instructors': instructor_ids,
+        'seminars': seminar_ids,
+        'big_seminar': big.id,
+        'surveys': [first + i for i in rng.sample(range(surveys), min(surveys, 1000))],
+        'oses': [os.id for os in oses],
+    }
+
+
+def endpoints(ctx):
+    # (이름, 메서드, i -> (경로, 본문, 요청 유저)) 목록입니다. i 는 같은 엔드포인트를 몇 번째 부르는지이며,
+    # 쓰기 요청은 i 마다 다른 유저나 이메일을 써서 매번 같은 일을 하도록 합니다.
+    def nth(ids, i):
+        return ids[i % len(ids)] if ids else 0
+
+    participants, instructor, staff = ctx['participants'], ctx['instructor'], ctx['staff']
+    big = ctx['big_seminar']
+    signup = {'role': 'participant', 'password': PASSWORD, 'university': '서울대학교'}
+
+    return [
+        ('seminar-list', 'GET', lambda i: ('/api/v1/seminar/', None, staff)),
+        ('seminar-list-stream', 'GET', lambda i: ('/api/v1/seminar/?stream=ndjson', None, staff)),
+        ('seminar-list-filter', 'GET', lambda i: (
+            '/api/v1/seminar/?name_prefix=세미나1&online=true&time_after=09:00&time_before=12:00', None, staff)),
+        ('seminar-retrieve', 'GET', lambda i: (f'/api/v1/seminar/{nth(ctx["seminars"], i)}/', None, staff)),
+        ('seminar-create', 'POST', lambda i: (
+            '/api/v1/seminar/', {'name': f'새 세미나{i}', 'capacity': 40, 'time': '14:00'}, instructor)),
+        ('seminar-update', 'PUT', lambda i: (f'/api/v1/seminar/{big}/', {'name': f'벤치마크{i}'}, instructor)),
+        ('seminar-cache-stats', 'GET', lambda i: ('/api/v1/seminar/cache_stats/', None, staff)),
+        ('seminar-register', 'POST', lambda i: (
+            f'/api/v1/seminar/{big}/user/', {'role': 'participant'}, User(id=nth(participants, i)))),
+        ('seminar-drop', 'DELETE', lambda i: (f'/api/v1/seminar/{big}/user/', {}, User(id=nth(participants, i)))),
+        ('seminar-bulk-register', 'POST', lambda i: (
+            f'/api/v1/seminar/{big}/user/bulk/',
+            {'users': [str(nth(participants, -1 - i * BULK_SIZE - j)) for j in range(BULK_SIZE)]}, staff)),
+        ('user-me', 'GET', lambda i: ('/api/v1/user/me/', None, User(id=nth(participants, i)))),
+        ('user-update', 'PUT', lambda i: (
+            '/api/v1/user/me/', {'first_name': '와플', 'last_name': '스튜디오'}, User(id=nth(participants, i)))),
+        ('user-participant', 'POST', lambda i: (
+            '/api/v1/user/participant/', {'university': '서울대학교'}, User(id=nth(ctx['instructors'], i)))),
+        ('signup', 'POST', lambda i: (
+            '/api/v1/signup/', {**signup, 'email': f'signup{i}@benchmark.org', 'username': f'signup{i}'}, None)),
+        ('signup-bulk', 'POST', lambda i: ('/api/v1/signup/bulk/', {'users': [
+            {**signup, 'email': f'bulk{i}-{j}@benchmark.org', 'username': f'bulk{i}-{j}'} for j in range(BULK_SIZE)
+        ]}, staff)),
+        ('login', 'POST', lambda i: (
+            '/api/v1/login/', {'email': f'user{i % max(len(participants), 1)}@benchmark.com', 'password': PASSWORD},
+            None)),
+        ('easy-login', 'POST', lambda i: (
+            '/api/v1/easy_login/', {'email': 'staff@benchmark.org', 'password': PASSWORD}, None)),
+        ('survey-list', 'GET', lambda i: ('/api/v1/survey/', None, None)),
+        ('survey-retrieve', 'GET', lambda i: (f'/api/v1/survey/{nth(ctx["surveys"], i)}/', None, None)),
+        ('survey-statistics', 'GET', lambda i: ('/api/v1/survey/statistics/', None, None)),
+        ('survey-top-50', 'GET', lambda i: ('/api/v1/survey/top_50/', None, None)),
+        ('survey-search', 'GET', lambda i: ('/api/v1/survey/search/?q=벤치마크', None, None)),
+        ('survey-create', 'POST', lambda i: ('/api/v1/survey/', {
+            'os_name': 'MacOS', 'python': 3, 'rdb': 2, 'programming': 4, 'major': '컴퓨터공학부', 'grade': '2학년',
+            'backend_reason': '벤치마크'}, User(id=nth(participants, i)))),
+        ('os-list', 'GET', lambda i: ('/api/v1/os/', None, staff)),
+        ('os-retrieve', 'GET', lambda i: (f'/api/v1/os/{nth(ctx["oses"], i)}/', None, staff)),
+        ('query-practice', 'GET', lambda i: ('/api/v1/query_practice/', None, staff)),
+        ('swagger', 'GET', lambda i: ('/swagger/?format=openapi', None, None)),
+    ]
+
+
+def call(client, method, path, data, user):
+    headers = {}
+    if user is not None:
+        # jwt_token_of 는 id 와 email 만 쓰므로, 매번 유저를 읽지 않도록 id 만 채운 User 도 받습니다.
+        if not user.email:
+            user = User.objects.get(id=user.id)
+        headers['HTTP_AUTHORIZATION'] = 'JWT ' + jwt_token_of(user)
+    kwargs = {'content_type': 'application/json'} if data is not None else {}
+    response = getattr(client, method.lower())(path, data, **kwargs, **headers)
+    if getattr(response, 'streaming', False):
+        # 스트리밍 응답은 본문을 다 읽어야 쿼리와 직렬화가 끝납니다.
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def percentile(values, p):
+    # 가장 가까운 순위(nearest-rank) 방식. values 는 정렬되어 있어야 합니다.
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50': round(percentile(latencies, 50), 3),
+        'p95': round(percentile(latencies, 95), 3),
+        'p99': round(percentile(latencies, 99), 3),
+        'mean': round(statistics.fmean(latencies), 3),
+        'max': round(latencies[-1], 3),
+    }
+
+
+def measure(client, method, request_of, requests, warmup):
+    # 토큰 발급과 유저 조회는 요청 전에 끝내, 재는 시간에는 요청 처리만 들어가도록 합니다.
+    for i in range(warmup):
+        call(client, method, *request_of(i))
+
+    latencies, queries, statuses = [], [], {}
+    for i in range(warmup, warmup + requests):
+        path, data, user = request_of(i)
+        if user is not None and not user.email:
+            user = User.objects.get(id=user.id)
+        metrics = QueryMetrics()
+        with connection.execute_wrapper(metrics):
+            start = time.perf_counter()
+            response = call(client, method, path, data, user)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(metrics.count)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    # tracemalloc 은 느려지므로 지연 시간을 잰 뒤 한 번 더 불러 최대 메모리만 따로 잽니다.
+    tracemalloc.start()
+    try:
+        call(client, method, *request_of(warmup + requests))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': requests,
+        'status': {str(code): count for code, count in sorted(statuses.items())},
+        'latency_ms': latency_summary(latencies),
+        'queries': {'min': min(queries), 'median': statistics.median(queries), 'max': max(queries)},
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(ctx, sizes, requests=100, warmup=5, only=None):
+    results = {}
+    client = Client()
+    # query_practice 처럼 print 하는 뷰가 JSON 출력에 섞이지 않도록 합니다.
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, method, request_of in endpoints(ctx):
+            if only and name not in only:
+                continue
+            results[name] = {'method': method, 'path': request_of(0)[0],
+                             **measure(client, method, request_of, requests, warmup)}
+    # 로그인 시각은 모아두었다가 반영하므로, 잰 요청에서 생긴 것까지 여기서 마저 반영합니다.
+    last_login_buffer.flush()
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'sizes': sizes,
+            'requests': requests,
+            'warmup': warmup,
+        },
+        'endpoints': results,
+    }
+
+
+# WSGI 와 ASGI 배포의 동시성 비교. (python manage.py benchmark_asgi 참고)
+# 서버 프로세스를 띄우는 대신 두 애플리케이션을 같은 프로세스에서 서버처럼 돌리고, 두 배포에 똑같은 느린 클라이언트를 붙입니다.
+# 클라이언트 clients 명은 요청마다 소켓(socketpair)을 하나 열어 HTTP 요청을 TRICKLE_CHUNKS 번에 나눠 client_delay 초 동안 보내고,
+# 응답을 다 받으면 다음 요청을 보냅니다. 서버 쪽은 요청을 소켓에서 읽는 방식만 다릅니다.
+# WSGI 는 gunicorn 의 sync/gthread 워커처럼 threads 개의 워커 스레드가 요청을 다 읽을 때까지 소켓에서 기다렸다가 처리하고,
+# ASGI 는 uvicorn 처럼 (클라이언트와 다른 스레드의) 이벤트 루프가 소켓을 기다렸다가 async view 에 넘깁니다.
+# (ORM 은 ASYNC_DB_THREADS 개의 스레드에서 실행) 실제 네트워크, HTTP 파싱, 서버 프로세스는 흉내내지 않습니다.
+
+READ_ENDPOINTS = ('seminar-list', 'seminar-retrieve', 'survey-list', 'survey-retrieve', 'os-list')
+TRICKLE_CHUNKS = 10  # 느린 클라이언트가 요청 하나를 나눠 보내는 횟수
+SIMULATED = ('같은 프로세스의 클라이언트가 socketpair 로 HTTP 요청을 나눠 보내는 느린 클라이언트를 흉내냅니다. '
+             'WSGI 워커 스레드와 ASGI 이벤트 루프는 서버를 흉내낸 것이며, 실제 네트워크와 서버 프로세스는 쓰지 않습니다.')
+
+
+def read_requests(ctx, requests):
+    # (엔드포인트 이름, 경로, WSGI 헤더) 목록을 READ_ENDPOINTS 순서대로 돌아가며 만듭니다. 토큰은 미리 발급해둡니다.
+    request_of = {name: request_of for name, _, request_of in endpoints(ctx) if name in READ_ENDPOINTS}
+    tokens = {}
+    result = []
+    for i in range(requests):
+        name = READ_ENDPOINTS[i % len(READ_ENDPOINTS)]
+        path, _, user = request_of[name](i)
+        headers = {}
+        if user is not None:
+            if user.id not in tokens:
+                tokens[user.id] = 'JWT ' + jwt_token_of(user)
+            headers['HTTP_AUTHORIZATION'] = tokens[user.id]
+        result.append((name, path, headers))
+    return result
+
+
+def request_bytes(path, headers):
+    lines = [f'GET {path} HTTP/1.1', 'Host: testserver']
+    lines += [f'{key[len("HTTP_"):].replace("_", "-").title()}: {value}' for key, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+
+def parse_request(data):
+    # (경로, [(소문자 헤더 이름, 값)]) 을 돌려줍니다. request_bytes 로 만든 요청만 읽으면 됩니다.
+    request_line, *header_lines = data.split(b'\r\n\r\n', 1)[0].decode('latin-1').split('\r\n')
+    _, path, _ = request_line.split(' ')
+    headers = [line.split(':', 1) for line in header_lines]
+    return path, [(name.strip().lower(), value.strip()) for name, value in headers]
+
+
+def serve_wsgi(application, factory, sock):
+    # 느린 클라이언트가 요청을 다 보낼 때까지 워커 스레드가 소켓에서 기다리며 붙잡혀 있습니다.
+    with sock:
+        data = b''
+        while b'\r\n\r\n' not in data:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return
+            data += chunk
+        path, headers = parse_request(data)
+        environ = factory.get(path, **{
+            f'HTTP_{name.upper().replace("-", "_")}': value for name, value in headers
+        }).environ
+
+        statuses = []
+        response = application(environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+        try:
+            body = b''.join(response)
+        finally:
+            response.close()
+        sock.sendall(f'HTTP/1.1 {statuses[0]}\r\n\r\n'.encode() + body)
+
+
+async def serve_asgi(application, sock):
+    # 요청을 다 받을 때까지는 이벤트 루프만 소켓을 기다리고, 스레드는 쓰지 않습니다.
+    loop = asyncio.get_running_loop()
+    with sock:
+        sock.setblocking(False)
+        data = b''
+        while b'\r\n\r\n' not in data:
+            chunk = await loop.sock_recv(sock, 4096)
+            if not chunk:
+                return
+            data += chunk
+        path, headers = parse_request(data)
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [(name.encode(), value.encode()) for name, value in headers],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # 클라이언트는 응답을 다 받을 때까지 연결을 끊지 않습니다.
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                await loop.sock_sendall(sock, f'HTTP/1.1 {message["status"]}\r\n\r\n'.encode())
+            elif message['type'] == 'http.response.body':
+                await loop.sock_sendall(sock, message.get('body', b''))
+
+        await application(scope, receive, send)
+
+
+def concurrency_result(latencies, statuses, elapsed):
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'status': {str(code): count for code, count in sorted(statuses.items())},
+        'latency_ms': latency_summary(latencies),
+    }
+
+
+def run_clients(requests, clients, client_delay, serve):
+    # clients 명의 느린 클라이언트가 requests 를 나눠 보냅니다. 두 배포 모두 이 함수로 같은 방식으로 요청합니다.
+    # serve(소켓) 은 서버 쪽 소켓을 넘겨받아 처리를 시작시키고, 끝나면 결과가 나오는 future 를 바로 돌려줍니다.
+    pending = iter(requests)
+    latencies, statuses = [], {}
+
+    async def client():
+        loop = asyncio.get_running_loop()
+        for _, path, headers in pending:
+            client_sock, server_sock = socket.socketpair()
+            with client_sock:
+                client_sock.setblocking(False)
+                start = time.perf_counter()
+                served = serve(server_sock)
+
+                request = request_bytes(path, headers)
+                size = math.ceil(len(request) / TRICKLE_CHUNKS)
+                for i in range(0, len(request), size):
+                    await asyncio.sleep(client_delay / TRICKLE_CHUNKS)
+                    await loop.sock_sendall(client_sock, request[i:i + size])
+
+                response = b''
+                while chunk := await loop.sock_recv(client_sock, 65536):
+                    response += chunk
+                latencies.append((time.perf_counter() - start) * 1000)
+            # 서버 쪽에서 난 예외는 여기서 다시 올립니다.
+            await asyncio.wrap_future(served)
+            code = int(response.split(b'\r\n', 1)[0].split(b' ')[1])
+            statuses[code] = statuses.get(code, 0) + 1
+
+    async def main():
+        await asyncio.gather(*(client() for _ in range(clients)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+
+    return concurrency_result(latencies, statuses, elapsed)
+
+
+def run_wsgi(requests, clients, threads, client_delay):
+    application, factory = get_wsgi_application(), RequestFactory()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi-worker') as workers:
+        return run_clients(requests, clients, client_delay,
+                           lambda sock: workers.submit(serve_wsgi, application, factory, sock))
+
+
+def run_asgi(requests, clients, client_delay):
+    # 서버의 이벤트 루프는 클라이언트와 다른 스레드에서 돌립니다.
+    application = get_asgi_application()
+    loop = asyncio.new_event_loop()
+    server = threading.Thread(target=loop.run_forever, name='asgi-server')
+    server.start()
+    try:
+        return run_clients(requests, clients, client_delay,
+                           lambda sock: asyncio.run_coroutine_threadsafe(serve_asgi(application, sock), loop))
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        server.join()
+        loop.close()
+
+
+def run_concurrency_benchmark(ctx, sizes, requests=1000, clients=100, threads=None, client_delay=0.5, warmup=20):
+    threads = threads or settings.ASYNC_DB_THREADS
+    work = read_requests(ctx, warmup + requests)
+    warmup_requests, measured = work[:warmup], work[warmup:]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # 캐시와 커넥션을 데운 뒤, 두 배포에 같은 요청을 같은 순서로 보냅니다.
+        run_wsgi(warmup_requests, clients=threads, threads=threads, client_delay=0)
+        wsgi = run_wsgi(measured, clients=clients, threads=threads, client_delay=client_delay)
+        asgi = run_asgi(measured, clients=clients, client_delay=client_delay)
+    last_login_buffer.flush()
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'sizes': sizes,
+            'requests': requests,
+            'clients': clients,
+            'wsgi_threads': threads,
+            'async_db_threads': settings.ASYNC_DB_THREADS,
+            'client_delay_ms': round(client_delay * 1000, 3),
+            'trickle_chunks': TRICKLE_CHUNKS,
+            'simulated': SIMULATED,
+            'endpoints': list(READ_ENDPOINTS),
+        },
+        'wsgi': wsgi,
+        'asgi': asgi,
+    }
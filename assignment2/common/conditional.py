@@ -0,0 +1,38 @@
+import hashlib
+
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+# 상세 조회(retrieve)의 조건부 요청(If-None-Match) 처리.
+# 응답 본문 대신, 본문을 결정하는 컬럼과 관련 행의 max(updated_at), 개수만 한 번의 쿼리로 읽어 ETag 를 만듭니다.
+# 어떤 값을 읽을지는 각 Serializer 의 etag_fields 에 적어둡니다.
+
+
+def object_id(pk):
+    # ETag 를 읽기 전에 URL 의 pk 를 정수로 바꿉니다. 숫자가 아니면 get_object() 와 마찬가지로 404 입니다.
+    try:
+        return int(pk)
+    except (TypeError, ValueError):
+        raise Http404
+
+
+def etag_of(*values):
+    return quote_etag(hashlib.md5(repr(values).encode('utf-8')).hexdigest())
+
+
+def etag_for(queryset, fields, aggregates=None):
+    # fields 는 values_list 로 그대로 읽을 컬럼, aggregates 는 {이름: Max(...) 등} 입니다. 행이 없으면 None 을 돌려줍니다.
+    aggregates = aggregates or {}
+    row = queryset.annotate(**aggregates).values_list(*fields, *aggregates).first()
+    return None if row is None else etag_of(*row)
+
+
+def not_modified(request, etag):
+    # 클라이언트가 가진 응답이 그대로라면 304 응답을, 아니면 None 을 돌려줍니다.
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
@@ -0,0 +1,72 @@
+import contextlib
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# 읽기 전용 복제 DB(settings.REPLICA_DATABASES) 라우팅.
+# common.middleware.ReplicaRoutingMiddleware 가 안전한(GET 등) 요청마다 복제 DB 하나를 골라 replica_alias 에 두면,
+# 그 요청 안의 읽기만 그리로 갑니다. 쓰기, 트랜잭션 안의 읽기, 요청 밖(관리 명령, 셸 등)의 읽기는 모두 primary(default)로 갑니다.
+# 쓰기 요청을 보낸 유저는 READ_AFTER_WRITE_PIN_SECONDS 동안 읽기도 primary 로 보내, 복제가 늦어도 방금 쓴 내용이 바로 보이게 합니다.
+
+replica_alias = ContextVar('replica_alias', default=None)
+
+
+def pin_cache_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin_user(user_id):
+    # 여러 프로세스가 함께 보도록 캐시(redis)에 둡니다. 프로세스마다 따로인 캐시와는 settings 에서 함께 쓸 수 없게 막습니다.
+    if settings.REPLICA_DATABASES:
+        cache.set(pin_cache_key(user_id), True, timeout=settings.READ_AFTER_WRITE_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(pin_cache_key(user_id), False)
+
+
+@contextlib.contextmanager
+def use_primary():
+    # 캐시에 넣어 오래 쓸 값처럼, 복제가 늦어 예전 값을 읽으면 안 되는 읽기를 감쌉니다.
+    token = replica_alias.set(None)
+    try:
+        yield
+    finally:
+        replica_alias.reset(token)
+
+
+def routed(alias, iterator):
+    # 스트리밍 응답의 본문은 미들웨어를 빠져나간 뒤에 읽히므로, 읽을 때마다 같은 복제 DB 를 다시 지정합니다.
+    iterator = iter(iterator)
+    while True:
+        token = replica_alias.set(alias)
+        try:
+            chunk = next(iterator, None)
+        finally:
+            replica_alias.reset(token)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias.get()
+        # select_for_update 처럼 트랜잭션 안에서 읽은 값으로 쓰는 경우가 있으므로 트랜잭션 안에서는 primary 를 읽습니다.
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 복제 DB 는 primary 와 같은 데이터이므로, 어느 쪽에서 읽은 객체끼리도 연결할 수 있습니다.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 복제 DB 의 스키마는 복제로 따라옵니다.
+        return db == DEFAULT_DB_ALIAS
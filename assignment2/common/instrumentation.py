@@ -0,0 +1,25 @@
+from contextvars import ContextVar
+
+from django.db import connections
+
+# 요청별 쿼리 계측(common.middleware.QueryInstrumentationMiddleware)에서 쿼리를 요청의 QueryMetrics 로 모으는 부분.
+# ASGI 에서는 한 요청의 쿼리가 미들웨어와 다른 스레드(db_executor, 동기 view 를 실행하는 스레드)에서 실행되고,
+# execute_wrapper 는 그 스레드의 커넥션에만 걸리므로, QueryMetrics 는 contextvar 로 넘기고 각 스레드의 커넥션에는
+# contextvar 를 보고 넘겨주는 record_query 를 씌워 둡니다. 스레드를 오갈 때 contextvar 는 복사되어 따라갑니다.
+
+query_metrics = ContextVar('query_metrics', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = query_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def instrument_connections():
+    # 이 스레드의 커넥션마다 record_query 를 한 번만 씌웁니다. 커넥션 객체는 스레드가 끝날 때까지 남으므로 다시 씌울 필요가 없고,
+    # 계측 중인 요청이 아니면(query_metrics 가 None) 그대로 실행합니다.
+    for connection in connections.all():
+        if record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(record_query)
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from common.benchmark import DEFAULT_SIZES, benchmark_database, endpoints, run_benchmark, seed
+
+
+class Command(BaseCommand):
+
+    help = ('벤치마크용 DB 를 따로 만들어 데이터를 채운 뒤, 모든 API 엔드포인트의 지연 시간(p50/p95/p99), 쿼리 수, '
+            '최대 메모리를 JSON 으로 출력합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=DEFAULT_SIZES['users'])
+        parser.add_argument('--seminars', type=int, default=DEFAULT_SIZES['seminars'])
+        parser.add_argument('--surveys', type=int, default=DEFAULT_SIZES['surveys'])
+        parser.add_argument('--requests', type=int, default=100, help='엔드포인트마다 재는 요청 수')
+        parser.add_argument('--warmup', type=int, default=5, help='재기 전에 버리는 요청 수')
+        parser.add_argument('--seed', type=int, default=0, help='같은 값이면 같은 데이터가 만들어집니다.')
+        parser.add_argument('--endpoint', action='append', dest='only',
+                            help='이 엔드포인트만 잽니다. 여러 번 줄 수 있습니다. (--list 로 이름 확인)')
+        parser.add_argument('--list', action='store_true', help='엔드포인트 이름만 출력합니다.')
+        parser.add_argument('--output', help='결과 JSON 을 쓸 파일 (기본값: 표준 출력)')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            ctx = {'staff': None, 'instructor': None, 'participants': [], 'instructors': [], 'seminars': [],
+                   'big_seminar': 0, 'surveys': [], 'oses': []}
+            for name, method, request_of in endpoints(ctx):
+                self.stdout.write(f'{name}\t{method} {request_of(0)[0]}')
+            return
+
+        sizes = {key: options[key] for key in DEFAULT_SIZES}
+
+        with benchmark_database():
+            self.stderr.write(f'seeding {sizes} ...')
+            ctx = seed(**sizes, seed=options['seed'])
+            self.stderr.write(f'running {options["requests"]} request(s) per endpoint ...')
+            report = run_benchmark(ctx, sizes, requests=options['requests'], warmup=options['warmup'],
+                                   only=options['only'])
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'wrote {options["output"]}'))
+        else:
+            self.stdout.write(output)
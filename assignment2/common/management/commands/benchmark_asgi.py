@@ -0,0 +1,46 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from common.benchmark import DEFAULT_SIZES, benchmark_database, run_concurrency_benchmark, seed
+
+
+class Command(BaseCommand):
+
+    help = ('벤치마크용 DB 를 따로 만들어 데이터를 채운 뒤, 느린 클라이언트가 많을 때 읽기 엔드포인트의 초당 요청 수와 '
+            '지연 시간(p50/p95/p99)을 WSGI 와 ASGI 배포로 각각 재서 JSON 으로 출력합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=DEFAULT_SIZES['users'])
+        parser.add_argument('--seminars', type=int, default=DEFAULT_SIZES['seminars'])
+        parser.add_argument('--surveys', type=int, default=DEFAULT_SIZES['surveys'])
+        parser.add_argument('--requests', type=int, default=1000, help='배포마다 재는 요청 수')
+        parser.add_argument('--warmup', type=int, default=20, help='재기 전에 버리는 요청 수')
+        parser.add_argument('--clients', type=int, default=100, help='동시에 요청하는 클라이언트 수')
+        parser.add_argument('--threads', type=int, default=settings.ASYNC_DB_THREADS,
+                            help='WSGI 워커 스레드 수 (기본값: ASYNC_DB_THREADS)')
+        parser.add_argument('--client-delay', type=float, default=500,
+                            help='클라이언트가 요청 하나를 나눠 보내는 데 걸리는 시간(ms)')
+        parser.add_argument('--seed', type=int, default=0, help='같은 값이면 같은 데이터가 만들어집니다.')
+        parser.add_argument('--output', help='결과 JSON 을 쓸 파일 (기본값: 표준 출력)')
+
+    def handle(self, *args, **options):
+        sizes = {key: options[key] for key in DEFAULT_SIZES}
+
+        with benchmark_database():
+            self.stderr.write(f'seeding {sizes} ...')
+            ctx = seed(**sizes, seed=options['seed'])
+            self.stderr.write(f'running {options["requests"]} request(s) from {options["clients"]} client(s) ...')
+            report = run_concurrency_benchmark(
+                ctx, sizes, requests=options['requests'], clients=options['clients'], threads=options['threads'],
+                client_delay=options['client_delay'] / 1000, warmup=options['warmup'],
+            )
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'wrote {options["output"]}'))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import random
+import time
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.settings import api_settings
+
+from common.async_views import run_in_db_thread
+from common.db_router import is_pinned, pin_user, replica_alias, routed
+from common.instrumentation import instrument_connections, query_metrics
+
+logger = logging.getLogger('waffle_backend.performance')
+
+
+class QueryMetrics:
+
+    # connection.execute_wrapper 로 등록되어, 요청 하나 동안 실행된 쿼리 수와 시간을 모읍니다.
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if duration > self.slowest_duration:
+                self.slowest_duration, self.slowest_sql = duration, sql
+
+
+def view_name_of(request, view_func):
+    # DRF 뷰는 'SeminarViewSet.list', 'UserSeminarView.post' 처럼 클래스와 액션(메서드) 이름으로 묶습니다.
+    cls = getattr(view_func, 'cls', None)
+    if cls is None or cls.__name__ == 'WrappedAPIView':
+        return f'{view_func.__module__}.{view_func.__name__}'
+
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+class QueryInstrumentationMiddleware:
+
+    # DEBUG_TOOLBAR 와 달리 운영 환경에서도 켤 수 있도록, SQL 파라미터는 남기지 않고
+    # 요청별 쿼리 수, DB 시간, 가장 느린 쿼리, 뷰 시간만 Server-Timing 헤더와 로그로 남깁니다.
+    # settings.QUERY_INSTRUMENTATION 이 켜져 있을 때만 MIDDLEWARE 에 추가됩니다.
+    # ASGI 에서 동기로 돌면 요청마다 스레드 하나를 끝까지 잡으므로, ReplicaRoutingMiddleware 처럼 두 방식을 모두 지원합니다.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        metrics = QueryMetrics()
+        start = time.perf_counter()
+        token = query_metrics.set(metrics)
+        try:
+            instrument_connections()
+            response = self.get_response(request)
+        finally:
+            query_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        # 쿼리는 async view 의 db_executor 스레드나 동기 view 를 실행하는 스레드에서 실행되므로, 그 스레드들에서 씌웁니다.
+        # (common.async_views.run_in_db_thread, process_view 참고)
+        metrics = QueryMetrics()
+        start = time.perf_counter()
+        token = query_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            query_metrics.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, total):
+        db_ms, total_ms = metrics.duration * 1000, total * 1000
+        response['Server-Timing'] = ', '.join((
+            f'db;desc="{metrics.count} queries";dur={db_ms:.2f}',
+            f'view;dur={total_ms - db_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ))
+
+        # async view(common.async_views.async_read_view)는 ROOT_URLCONF 에서 찾은 원래 view 로 resolver_match 를 바꿔둡니다.
+        match = getattr(request, 'resolver_match', None)
+        logger.info(json.dumps({
+            'view': view_name_of(request, match.func) if match is not None else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.count,
+            'db_ms': round(db_ms, 2),
+            'view_ms': round(total_ms - db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'slowest_ms': round(metrics.slowest_duration * 1000, 2),
+            'slowest_sql': metrics.slowest_sql,
+        }, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # ASGI 에서 동기 process_view 는 동기 view 와 미들웨어를 실행하는 스레드에서 불리므로, 그 스레드의 커넥션에 씌웁니다.
+        instrument_connections()
+
+
+class AsgiUrlconfMiddleware:
+
+    # ASGI 로 받은 요청은 settings.ASGI_URLCONF 로 라우팅해, 읽기 엔드포인트가 async view(common/async_views.py)로 가게 합니다.
+    # WSGI 로 받은 요청은 그대로 둡니다. MiddlewareMixin 은 ASGI 에서 요청마다 스레드를 오가므로 직접 두 방식을 모두 지원합니다.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # MiddlewareMixin 과 같은 방법으로 이 미들웨어를 코루틴 함수로 표시합니다.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.urlconf = settings.ASGI_URLCONF
+        return await self.get_response(request)
+
+
+def request_user_id(request):
+    # 뷰에서 인증하기 전이므로 JWT 의 user_id 나 세션의 유저 id 만 봅니다. 잘못된 토큰은 어차피 뷰에서 거부됩니다.
+    try:
+        token = JSONWebTokenAuthentication().get_jwt_value(request)
+        if token is not None:
+            return api_settings.JWT_DECODE_HANDLER(token).get('user_id')
+    except (exceptions.AuthenticationFailed, jwt.InvalidTokenError):
+        return None
+
+    session = getattr(request, 'session', None)
+    user_id = session.get(SESSION_KEY) if session is not None else None
+    return int(user_id) if user_id is not None else None
+
+
+class ReplicaRoutingMiddleware:
+
+    # 안전한 요청의 읽기를 복제 DB 중 하나로 보내고(common/db_router.py), 쓰기에 성공한 유저는 잠시 primary 에 고정합니다.
+    # settings.REPLICA_DATABASES 가 있을 때만 MIDDLEWARE 에 추가됩니다.
+    # 동기 전용 미들웨어가 하나라도 있으면 ASGI 에서도 전체가 동기로 바뀌어 AsgiUrlconfMiddleware 가 꺼지므로, 두 방식을 모두 지원합니다.
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def route(self, request):
+        # (요청한 유저 id, 읽기를 보낼 복제 DB) 를 돌려줍니다. primary 를 읽어야 하면 복제 DB 는 None 입니다.
+        user_id = request_user_id(request)
+        alias = None
+        if request.method in self.SAFE_METHODS and not (user_id is not None and is_pinned(user_id)):
+            alias = random.choice(settings.REPLICA_DATABASES)
+        return user_id, alias
+
+    def finish(self, request, response, user_id, alias):
+        if alias is not None and response.streaming:
+            response.streaming_content = routed(alias, response.streaming_content)
+
+        if request.method not in self.SAFE_METHODS and response.status_code < 400:
+            # DRF 는 인증한 유저를 request.user 에도 넣어둡니다.
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                user_id = user.id
+            if user_id is not None:
+                pin_user(user_id)
+        return response
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        user_id, alias = self.route(request)
+        token = replica_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_alias.reset(token)
+        return self.finish(request, response, user_id, alias)
+
+    async def __acall__(self, request):
+        # 캐시와 세션을 읽는 일은 이벤트 루프를 막지 않도록 async view 와 같은 db_executor 에서 하고,
+        # contextvar 는 이 요청의 컨텍스트에 둡니다. async view 와 동기 view 모두 이 컨텍스트를 복사해 가져가므로 같은 복제 DB 를 읽습니다.
+        user_id, alias = await run_in_db_thread(self.route, request)
+        token = replica_alias.set(alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_alias.reset(token)
+        return await run_in_db_thread(self.finish, request, response, user_id, alias)
@@ -0,0 +1,22 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+
+    # OFFSET 방식과 달리 커서(keyset) 방식은 '마지막으로 본 위치' 이후의 행만 WHERE 로 골라오므로,
+    # 몇 번째 페이지를 요청하든 비용이 같습니다.
+    # 기본 페이지 크기는 PAGE_SIZE, 최대 크기는 MAX_PAGE_SIZE 로 설정합니다.
+    page_size = getattr(settings, 'PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 100)
+
+
+class CreatedAtCursorPagination(BaseCursorPagination):
+
+    ordering = ('-created_at', '-id')
+
+
+class TimestampCursorPagination(BaseCursorPagination):
+
+    ordering = ('-timestamp', '-id')
@@ -0,0 +1,80 @@
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = 1000
+STREAM_FORMATS = {'1': 'json', 'json': 'json', 'ndjson': 'ndjson'}
+
+
+def iterate_chunks(queryset, chunk_size=STREAM_CHUNK_SIZE):
+    # QuerySet.iterator() 는 prefetch_related 를 무시하므로, chunk_size 개씩 끊어서 직접 prefetch 합니다.
+    lookups = queryset._prefetch_related_lookups
+    rows = queryset.prefetch_related(None).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        prefetch_related_objects(chunk, *lookups)
+        yield chunk
+
+
+def iterate_with_prefetch(queryset, chunk_size=STREAM_CHUNK_SIZE):
+    for chunk in iterate_chunks(queryset, chunk_size):
+        yield from chunk
+
+
+def stream_json(queryset, serialize, ndjson=False, chunk_size=STREAM_CHUNK_SIZE):
+    # 목록 전체를 serializer.data 로 메모리에 만든 뒤 응답하는 대신, 한 행씩 직렬화해서 바로 내보냅니다.
+    # 메모리 사용량은 chunk_size 에만 비례하고, 첫 바이트도 첫 chunk 를 읽자마자 나갑니다.
+    return stream_json_chunks(queryset, lambda chunk: map(serialize, chunk), ndjson, chunk_size)
+
+
+def stream_json_chunks(queryset, serialize_chunk, ndjson=False, chunk_size=STREAM_CHUNK_SIZE):
+    # stream_json 과 같지만 chunk 단위로 직렬화합니다. (chunk 마다 관련 행을 한 번에 읽어 붙이는 경우)
+    encoder = JSONEncoder(ensure_ascii=False)
+    rows = (encoder.encode(data) for chunk in iterate_chunks(queryset, chunk_size) for data in serialize_chunk(chunk))
+
+    if ndjson:
+        content, content_type = (row + '\n' for row in rows), 'application/x-ndjson'
+    else:
+        content, content_type = json_array(rows), 'application/json'
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+def json_array(rows):
+    yield '['
+    for i, row in enumerate(rows):
+        yield row if i == 0 else ',' + row
+    yield ']'
+
+
+class StreamingListMixin:
+
+    # ?stream=1 또는 ?stream=json (JSON 배열), ?stream=ndjson 으로 요청하면 페이지네이션 없이 전체 목록을 스트리밍합니다.
+
+    stream_chunk_size = STREAM_CHUNK_SIZE
+
+    def get_stream_format(self):
+        # 'json', 'ndjson' 또는 None(스트리밍하지 않음). 적어둔 값이 아니면(?stream=0, ?stream=false 등) 페이지네이션합니다.
+        return STREAM_FORMATS.get(self.request.query_params.get('stream'))
+
+    def get_stream_ordering(self, queryset):
+        # 페이지네이션과 같은 순서로 내보냅니다. (정렬 필터가 있으면 ?ordering= 을 따릅니다.)
+        if self.paginator is None:
+            return ()
+        return self.paginator.get_ordering(self.request, queryset, self)
+
+    def stream_list(self, queryset, serializer_class):
+        return stream_json(
+            queryset.order_by(*self.get_stream_ordering(queryset)),
+            lambda row: serializer_class(row, context=self.get_serializer_context()).data,
+            ndjson=(self.get_stream_format() == 'ndjson'),
+            chunk_size=self.stream_chunk_size,
+        )
+
+    def stream_list_chunks(self, queryset, serialize_chunk):
+        return stream_json_chunks(
+            queryset.order_by(*self.get_stream_ordering(queryset)),
+            serialize_chunk,
+            ndjson=(self.get_stream_format() == 'ndjson'),
+            chunk_size=self.stream_chunk_size,
+        )
@@ -0,0 +1,356 @@
+import json
+import os
+import sqlite3
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, router, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+
+from common import async_views
+from common.benchmark import benchmark_database, endpoints, percentile, run_benchmark, run_concurrency_benchmark, seed
+from common.db_router import pin_cache_key, replica_alias
+from seminar.models import ParticipantProfile, Seminar, UserSeminar
+from seminar.tests import SeminarFactory
+from survey.models import OperatingSystem, SurveyResult
+from user.models import User
+from user.serializers import jwt_token_of
+from user.test_user import UserFactory
+
+
+@override_settings(MIDDLEWARE=['common.middleware.QueryInstrumentationMiddleware'] + settings.MIDDLEWARE)
+class QueryInstrumentationMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory(email='test@test.com', is_participant=True)
+
+    def test_viewset_action(self):
+        client = self.client
+        client.force_login(self.user)
+
+        with self.assertLogs('waffle_backend.performance', level='INFO') as logs:
+            response = client.get('/api/v1/seminar/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # 세션 + 유저 + 세미나 목록 (세미나가 없으므로 강사 prefetch 는 생략됨)
+        self.assertIn('db;desc="3 queries"', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'SeminarViewSet.list')
+        self.assertEqual(record['queries'], 3)
+        self.assertEqual(record['status'], status.HTTP_200_OK)
+        self.assertIsNotNone(record['slowest_sql'])
+
+    def test_apiview_method(self):
+        client = self.client
+        client.force_login(self.user)
+
+        with self.assertLogs('waffle_backend.performance', level='INFO') as logs:
+            client.post('/api/v1/seminar/1/user/', data={'role': 'participant'})
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'UserSeminarView.post')
+        self.assertEqual(record['status'], status.HTTP_404_NOT_FOUND)
+
+
+class BenchmarkTest(TestCase):
+
+    def setUp(self):
+        # 쿼리 수를 빈 캐시 기준으로 확인하므로, 앞선 테스트가 같은 id 로 남긴 캐시를 지웁니다.
+        cache.clear()
+
+    def test_모든_엔드포인트(self):
+        sizes = {'users': 30, 'seminars': 5, 'surveys': 50}
+        ctx = seed(**sizes)
+        self.assertEqual(User.objects.filter(email__endswith='@benchmark.com').count(), 30)
+        self.assertEqual(Seminar.objects.count(), 6)
+        self.assertEqual(SurveyResult.objects.count(), 50)
+
+        report = run_benchmark(ctx, sizes, requests=2, warmup=1)
+        # 결과는 그대로 JSON 으로 쓸 수 있어야 합니다.
+        report = json.loads(json.dumps(report))
+
+        self.assertEqual(report['meta']['sizes'], sizes)
+        self.assertEqual(set(report['endpoints']), {name for name, _, _ in endpoints(ctx)})
+        for name, result in report['endpoints'].items():
+            # 유저가 적어 쓰기 요청이 같은 유저를 다시 쓰면 4xx 가 날 수 있지만, 5xx 는 없어야 합니다.
+            self.assertTrue(all(int(code) < 500 for code in result['status']), (name, result['status']))
+            latency = result['latency_ms']
+            self.assertLessEqual(latency['p50'], latency['p95'])
+            self.assertLessEqual(latency['p95'], latency['p99'])
+            self.assertGreater(result['peak_memory_kb'], 0)
+        # 캐시가 비어 있을 때: ETag, 세미나, 수강 정보
+        self.assertEqual(report['endpoints']['seminar-retrieve']['queries']['max'], 3)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_벤치마크_캐시는_운영_캐시와_따로(self):
+        # 벤치마크는 운영 캐시(redis)를 읽지도 비우지도 않고, 따로 쓴 캐시는 끝날 때 비웁니다.
+        cache.set('운영', 1)
+        with mock.patch.dict(connection.settings_dict['TEST']), \
+                mock.patch.object(connection.creation, 'create_test_db'), \
+                mock.patch.object(connection.creation, 'destroy_test_db'), \
+                mock.patch('common.benchmark.setup_test_environment'), \
+                mock.patch('common.benchmark.teardown_test_environment'):
+            with benchmark_database():
+                self.assertIsNone(cache.get('운영'))
+                cache.set('벤치마크', 1)
+            self.assertEqual(cache.get('운영'), 1)
+            with benchmark_database():
+                self.assertIsNone(cache.get('벤치마크'))
+
+
+class ConcurrencyBenchmarkTest(TransactionTestCase):
+
+    # WSGI 워커 스레드와 db_executor 가 각자의 커넥션으로 읽으므로, seed 한 데이터가 커밋되어 있어야 합니다.
+
+    def test_동시성_벤치마크(self):
+        sizes = {'users': 20, 'seminars': 3, 'surveys': 20}
+        ctx = seed(**sizes)
+
+        report = run_concurrency_benchmark(ctx, sizes, requests=10, clients=4, threads=2, client_delay=0, warmup=2)
+        report = json.loads(json.dumps(report))
+
+        for deployment in ('wsgi', 'asgi'):
+            self.assertEqual(report[deployment]['status'], {'200': 10})
+            self.assertGreater(report[deployment]['rps'], 0)
+        self.assertEqual(report['meta']['clients'], 4)
+
+
+class AsgiReadViewTest(TransactionTestCase):
+
+    # async view 는 ORM 을 다른 스레드의 커넥션으로 실행하므로, 테스트 데이터가 커밋되어 있어야 합니다.
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory(email='staff@test.com', is_staff=True, is_instructor=True)
+        self.token = 'JWT ' + jwt_token_of(self.user)
+        self.seminar = SeminarFactory(name='세미나', capacity=10, time=timezone.now().time())
+        UserSeminar.objects.create(seminar=self.seminar, user=self.user, is_instructor=True)
+        os = OperatingSystem.objects.create(name='os')
+        self.survey = SurveyResult.objects.create(os=os, python=1, rdb=2, programming=3)
+
+    def async_request(self, method, path, **extra):
+        async def request():
+            return await getattr(self.async_client, method)(path, authorization=self.token, **extra)
+        return async_to_sync(request)()
+
+    def assertSameResponse(self, path):
+        expected = self.client.get(path, HTTP_AUTHORIZATION=self.token)
+        response = self.async_request('get', path)
+
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(response.content, expected.content, path)
+        self.assertEqual(response['Content-Type'], expected['Content-Type'], path)
+        return response
+
+    def test_읽기_엔드포인트_WSGI_와_같은_응답(self):
+        with mock.patch('common.async_views.run_in_db_thread', wraps=async_views.run_in_db_thread) as run:
+            for path in ('/api/v1/seminar/', f'/api/v1/seminar/{self.seminar.id}/', '/api/v1/survey/',
+                         f'/api/v1/survey/{self.survey.id}/', '/api/v1/os/'):
+                self.assertSameResponse(path)
+        # 모두 async view 를 거쳐 db_executor 에서 실행되었습니다.
+        self.assertEqual(run.call_count, 5)
+
+    def test_없는_세미나(self):
+        self.assertEqual(self.assertSameResponse('/api/v1/seminar/0/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_인증_실패(self):
+        async def request():
+            return await self.async_client.get('/api/v1/seminar/')
+        response = async_to_sync(request)()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_스트리밍_목록(self):
+        response = self.async_request('get', '/api/v1/seminar/?stream=ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.streaming)
+        rows = [json.loads(line) for line in response.content.decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.seminar.id])
+
+    def test_조건부_요청(self):
+        response = self.async_request('get', f'/api/v1/seminar/{self.seminar.id}/')
+        response = self.async_request('get', f'/api/v1/seminar/{self.seminar.id}/', **{'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_쓰기_요청은_기존_view(self):
+        with mock.patch('common.async_views.run_in_db_thread') as run:
+            response = self.async_request('post', '/api/v1/seminar/', data={
+                'name': '새 세미나', 'capacity': 20, 'time': '14:00',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertFalse(run.called)
+        self.assertTrue(Seminar.objects.filter(name='새 세미나').exists())
+
+    def test_async_view_가_아닌_경로(self):
+        self.assertSameResponse('/api/v1/user/me/')
+
+
+
+@override_settings(MIDDLEWARE=['common.middleware.QueryInstrumentationMiddleware'] + settings.MIDDLEWARE)
+class AsgiQueryInstrumentationTest(TransactionTestCase):
+
+    # async view 는 db_executor 스레드의 커넥션으로 읽으므로, 테스트 데이터가 커밋되어 있어야 합니다.
+
+    def setUp(self):
+        self.user = UserFactory(email='staff@test.com', is_staff=True, is_instructor=True)
+        self.token = 'JWT ' + jwt_token_of(self.user)
+        SeminarFactory(name='세미나', capacity=10, time=timezone.now().time())
+
+    def get(self, path, asgi):
+        # 인증한 유저를 캐시해 두므로, 두 방식 모두 빈 캐시에서 같은 쿼리를 실행하게 합니다.
+        cache.clear()
+        with self.assertLogs('waffle_backend.performance', level='INFO') as logs:
+            if asgi:
+                async def request():
+                    return await self.async_client.get(path, authorization=self.token)
+                response = async_to_sync(request)()
+            else:
+                response = self.client.get(path, HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, json.loads(logs.records[0].getMessage())
+
+    def test_async_view_의_쿼리(self):
+        expected, expected_record = self.get('/api/v1/seminar/', asgi=False)
+        with mock.patch('common.async_views.run_in_db_thread', wraps=async_views.run_in_db_thread) as run:
+            response, record = self.get('/api/v1/seminar/', asgi=True)
+        self.assertTrue(run.called)
+
+        # db_executor 스레드에서 실행한 쿼리도 세고, view 이름은 async view 가 아니라 감싼 원래 view 입니다.
+        self.assertGreater(record['queries'], 0)
+        self.assertEqual(record['queries'], expected_record['queries'])
+        self.assertIn(f'db;desc="{record["queries"]} queries"', response['Server-Timing'])
+        self.assertEqual(record['view'], 'SeminarViewSet.list')
+        self.assertEqual(record['view'], expected_record['view'])
+
+    def test_동기_view_의_쿼리(self):
+        _, expected_record = self.get('/api/v1/user/me/', asgi=False)
+        response, record = self.get('/api/v1/user/me/', asgi=True)
+        self.assertGreater(record['queries'], 0)
+        self.assertEqual(record['queries'], expected_record['queries'])
+        self.assertEqual(record['view'], expected_record['view'])
+
+
+REPLICA = 'replica'
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA],
+                   MIDDLEWARE=settings.MIDDLEWARE + ['common.middleware.ReplicaRoutingMiddleware'])
+class ReplicaRoutingTest(TransactionTestCase):
+
+    # primary 테스트 DB 옆에 sqlite DB 를 하나 더 만들어 복제 DB 로 씁니다.
+    # replicate() 를 부른 때까지만 복제되므로, 그 뒤에 primary 에 쓴 내용은 복제가 늦은 것처럼 복제 DB 에 없습니다.
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # 테스트 러너가 만드는 DB 가 아니므로, 테스트 클래스의 databases 대신 여기서 직접 연결을 추가합니다.
+        cls.replica_path = f'{connection.settings_dict["NAME"]}_replica'
+        connections.databases[REPLICA] = {**connection.settings_dict, 'NAME': cls.replica_path}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        os.remove(cls.replica_path)
+        super().tearDownClass()
+
+    def replicate(self):
+        connections[REPLICA].close()
+        with sqlite3.connect(connection.settings_dict['NAME']) as primary, sqlite3.connect(self.replica_path) as replica:
+            primary.backup(replica)
+
+    def setUp(self):
+        cache.clear()
+        self.writer = UserFactory(email='writer@test.com', is_participant=True)
+        self.reader = UserFactory(email='reader@test.com', is_participant=True)
+        self.seminar = SeminarFactory(name='세미나', capacity=10, time=timezone.now().time())
+        self.replicate()
+
+    def get(self, path, user):
+        return self.client.get(path, HTTP_AUTHORIZATION='JWT ' + jwt_token_of(user))
+
+    def participant_count(self, user):
+        response = self.get('/api/v1/seminar/', user)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row['id']: row['participant_count'] for row in response.json()['results']}[self.seminar.id]
+
+    def test_안전한_요청은_복제_DB(self):
+        SeminarFactory(name='새 세미나', capacity=10, time=timezone.now().time())
+
+        response = self.get('/api/v1/seminar/', self.reader)
+        self.assertEqual([row['name'] for row in response.json()['results']], ['세미나'])
+        self.assertEqual(Seminar.objects.count(), 2)
+
+    def test_쓰기_후에는_primary(self):
+        response = self.client.post(f'/api/v1/seminar/{self.seminar.id}/user/', {'role': 'participant'},
+                                    HTTP_AUTHORIZATION='JWT ' + jwt_token_of(self.writer))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # 쓴 유저는 바로 보이고, 다른 유저는 복제가 따라올 때까지 예전 값을 봅니다.
+        self.assertEqual(self.participant_count(self.writer), 1)
+        self.assertEqual(self.participant_count(self.reader), 0)
+
+        cache.delete(pin_cache_key(self.writer.id))
+        self.assertEqual(self.participant_count(self.writer), 0)
+
+        self.replicate()
+        self.assertEqual(self.participant_count(self.reader), 1)
+
+    def test_가입한_유저는_primary(self):
+        response = self.client.post('/api/v1/signup/', {
+            'email': 'new@test.com', 'username': 'new', 'password': 'password', 'role': 'participant',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get('/api/v1/user/me/', HTTP_AUTHORIZATION='JWT ' + response.json()['token'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['email'], 'new@test.com')
+
+    def test_캐시에_넣을_값은_primary(self):
+        UserSeminar.objects.create(seminar=self.seminar, user=self.writer)
+
+        response = self.get(f'/api/v1/seminar/{self.seminar.id}/', self.reader)
+        self.assertEqual(len(response.json()['participants']), 1)
+
+    def test_스트리밍_목록도_복제_DB(self):
+        SeminarFactory(name='새 세미나', capacity=10, time=timezone.now().time())
+
+        response = self.get('/api/v1/seminar/?stream=ndjson', self.reader)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['세미나'])
+
+    def test_ASGI_에서도_async_view_와_복제_DB(self):
+        SeminarFactory(name='새 세미나', capacity=10, time=timezone.now().time())
+
+        async def request():
+            return await self.async_client.get('/api/v1/seminar/', authorization='JWT ' + jwt_token_of(self.reader))
+
+        with mock.patch('common.async_views.run_in_db_thread', wraps=async_views.run_in_db_thread) as run:
+            response = async_to_sync(request)()
+        # 복제 DB 라우팅 미들웨어가 있어도 미들웨어 체인이 async 로 남아 async view 를 거칩니다.
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual([row['name'] for row in response.json()['results']], ['세미나'])
+
+    def test_요청_밖과_트랜잭션_안은_primary(self):
+        self.assertEqual(router.db_for_read(Seminar), 'default')
+
+        token = replica_alias.set(REPLICA)
+        try:
+            self.assertEqual(router.db_for_read(Seminar), REPLICA)
+            self.assertEqual(router.db_for_write(Seminar), 'default')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(ParticipantProfile), 'default')
+        finally:
+            replica_alias.reset(token)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SeminarConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'seminar'
+
+    def ready(self):
+        from seminar import signals  # noqa: F401
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from common.db_router import use_primary
+
+# 세미나 상세 응답(SeminarSerializer)은 수강생/강사 목록을 만드느라 쿼리가 두 번 더 나가는데,
+# 바뀌는 일보다 읽히는 일이 훨씬 많으므로 직렬화 결과를 통째로 캐시합니다.
+# Seminar 나 UserSeminar 가 저장되면 seminar/signals.py 에서 해당 세미나의 캐시를 지웁니다.
+# 캐시에 넣을 값은 복제 DB 가 늦어 예전 값이 오래 남지 않도록 primary 에서 읽습니다. (common/db_router.py 참고)
+
+HIT_KEY = 'seminar:detail:hit'
+MISS_KEY = 'seminar:detail:miss'
+
+
+def seminar_cache_key(seminar_id):
+    # '1', '01' 처럼 같은 세미나를 가리키는 pk 가 서로 다른 키가 되지 않도록 정수로 맞춥니다.
+    return f'seminar:detail:{int(seminar_id)}'
+
+
+def count(key):
+    # 여러 프로세스에서 함께 볼 수 있도록 카운터도 캐시에 둡니다.
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # add 와 incr 사이에 키가 지워진 경우
+        cache.set(key, 1, timeout=None)
+
+
+def get_seminar_data(seminar_id):
+    # 캐시에 없을 때만 세미나를 읽어 상세 응답을 만듭니다. 세미나가 없으면 None 을 돌려줍니다.
+    # (SeminarSerializer 와 같은 결과를 .values() 로 만드는 seminar/fast_serializers.py 를 씁니다.)
+    from seminar.fast_serializers import seminar_detail_data
+
+    key = seminar_cache_key(seminar_id)
+    data = cache.get(key)
+    if data is not None:
+        count(HIT_KEY)
+        return data
+
+    count(MISS_KEY)
+    with use_primary():
+        data = seminar_detail_data(seminar_id)
+    if data is None:
+        return None
+    cache.set(key, data, timeout=settings.SEMINAR_CACHE_TIMEOUT)
+    return data
+
+
+def seminar_etag_cache_key(seminar_id):
+    return f'seminar:etag:{int(seminar_id)}'
+
+
+def get_seminar_etag(seminar_id):
+    # 상세 응답의 ETag 도 상세 응답과 같은 때에 지워지므로 함께 캐시해, 캐시에 있으면 쿼리 없이 304 를 돌려줄 수 있게 합니다.
+    # 세미나가 없으면 None 을 돌려줍니다.
+    from common.conditional import etag_for
+    from seminar.models import Seminar
+    from seminar.serializers import SeminarSerializer
+
+    key = seminar_etag_cache_key(seminar_id)
+    etag = cache.get(key)
+    if etag is None:
+        with use_primary():
+            etag = etag_for(Seminar.objects.filter(id=seminar_id), *SeminarSerializer.etag_fields())
+        if etag is not None:
+            cache.set(key, etag, timeout=settings.SEMINAR_CACHE_TIMEOUT)
+    return etag
+
+
+def invalidate_seminar(seminar_id):
+    keys = [seminar_cache_key(seminar_id), seminar_etag_cache_key(seminar_id)]
+    cache.delete_many(keys)
+    # 트랜잭션이 커밋되기 전에 다른 요청이 예전 값을 다시 캐시했을 수 있으므로, 커밋 후 한 번 더 지웁니다.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def seminar_cache_stats():
+    hit, miss = cache.get(HIT_KEY, 0), cache.get(MISS_KEY, 0)
+    return {
+        'hit': hit,
+        'miss': miss,
+        'hit_rate': round(hit / (hit + miss), 4) if hit + miss else None,
+    }
@@ -0,0 +1,76 @@
+from collections import defaultdict
+
+from .models import Seminar, UserSeminar
+
+# 세미나 목록/상세 응답을 만드는 읽기 전용 경로.
+# SeminarViewSerializer, SeminarSerializer 와 바이트 단위로 같은 JSON 을 만들지만, 모델 인스턴스나 DRF 필드 객체를
+# 거치지 않고 .values() 로 읽은 행에서 바로 dict 를 만듭니다. 쿼리가 고정된 뒤에는 DRF 필드 처리가 CPU 를 대부분 쓰기 때문입니다.
+# 응답 모양을 바꿀 때는 두 쪽을 함께 고쳐야 하며, seminar/tests.py 의 FastSerializerTest 가 두 결과를 비교합니다.
+# (성능 비교는 python manage.py benchmark_serializers)
+
+LIST_FIELDS = ('id', 'name', 'count', 'created_at', 'time')  # created_at, time 은 정렬(커서 페이지네이션)에 씁니다.
+DETAIL_FIELDS = ('id', 'online', 'time', 'name', 'capacity', 'count')
+TIME_FORMAT = '%H:%M'  # SeminarSerializer.time
+
+
+def instructor_data(user_seminar_id):
+    # InstructorSerializer 는 UserSeminar 행에 쓰이므로 id 는 UserSeminar 의 id 이고, company/year 는 기본값이 나갑니다.
+    return {'id': user_seminar_id, 'company': '', 'year': None}
+
+
+def participant_data(user_seminar_id):
+    # ParticipantSerializer 도 마찬가지로 UserSeminar 행에 쓰입니다.
+    return {'id': user_seminar_id, 'university': '', 'accepted': True}
+
+
+def instructor_ids_of(seminar_ids):
+    # SeminarViewSet 의 instructor_seminars prefetch 와 같은 조건, 같은 순서로 한 번에 읽습니다.
+    instructor_ids = defaultdict(list)
+    for seminar_id, user_seminar_id in UserSeminar.objects.filter(
+        seminar_id__in=seminar_ids, is_instructor=True
+    ).order_by('id').values_list('seminar_id', 'id'):
+        instructor_ids[seminar_id].append(user_seminar_id)
+    return instructor_ids
+
+
+def seminar_list_row(seminar_id, name, count, instructor_ids):
+    # SeminarViewSerializer
+    return {
+        'id': seminar_id,
+        'name': name,
+        'instructors': [instructor_data(user_seminar_id) for user_seminar_id in instructor_ids],
+        'participant_count': count,
+    }
+
+
+def seminar_list_data(rows):
+    # rows 는 Seminar 의 LIST_FIELDS 를 읽은 .values() 행입니다. 강사 목록까지 쿼리 한 번으로 만듭니다.
+    instructor_ids = instructor_ids_of([row['id'] for row in rows])
+    return [seminar_list_row(row['id'], row['name'], row['count'], instructor_ids[row['id']]) for row in rows]
+
+
+def seminar_detail_data(seminar_id):
+    # SeminarSerializer. 세미나가 없으면 None 을 돌려줍니다.
+    row = Seminar.objects.filter(id=seminar_id).values(*DETAIL_FIELDS).first()
+    if row is None:
+        return None
+
+    participants, instructors = [], []
+    for user_seminar_id, is_instructor in UserSeminar.objects.filter(seminar_id=seminar_id).order_by('id').values_list(
+        'id', 'is_instructor'
+    ):
+        if is_instructor:
+            instructors.append(instructor_data(user_seminar_id))
+        else:
+            participants.append(participant_data(user_seminar_id))
+
+    return {
+        'id': row['id'],
+        'online': row['online'],
+        'participants': participants,
+        'instructors': instructors,
+        'time': row['time'].strftime(TIME_FORMAT),
+        'name': row['name'],
+        'capacity': row['capacity'],
+        'count': row['count'],
+    }
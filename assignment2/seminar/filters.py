@@ -0,0 +1,54 @@
+import django_filters
+from rest_framework.filters import OrderingFilter
+
+from .models import Seminar, UserSeminar
+
+# 세미나 목록(GET /api/v1/seminar/)의 검색 조건과 정렬.
+# 각 조건은 Seminar.Meta.indexes 의 인덱스로 맞는 행만 찾도록 만들어, 목록 비용이 전체 세미나 수가 아니라 결과 수에 비례합니다.
+
+
+def prefix_upper_bound(prefix):
+    # prefix 로 시작하는 문자열은 모두 [prefix, prefix 의 마지막 글자를 하나 올린 문자열) 범위에 있습니다.
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SeminarFilter(django_filters.FilterSet):
+
+    name = django_filters.CharFilter()
+    name_prefix = django_filters.CharFilter(method='filter_name_prefix')
+    # 가운데 글자는 B-tree 인덱스로 찾을 수 없어 이름을 모두 훑습니다.
+    name_contains = django_filters.CharFilter(field_name='name', lookup_expr='icontains')
+    online = django_filters.BooleanFilter(method='filter_online')
+    # ?time_after=09:00&time_before=12:00 (양 끝 포함)
+    time = django_filters.TimeRangeFilter()
+    # 이 유저(id)가 강사인 세미나
+    instructor = django_filters.NumberFilter(method='filter_instructor')
+
+    class Meta:
+        model = Seminar
+        fields = ('name', 'online')
+
+    def filter_name_prefix(self, queryset, name, value):
+        # sqlite 는 ESCAPE 가 붙은 LIKE(startswith)에 인덱스를 쓰지 않으므로, 같은 뜻의 범위 조건을 함께 걸어 name 인덱스를 탑니다.
+        return queryset.filter(name__gte=value, name__lt=prefix_upper_bound(value), name__startswith=value)
+
+    def filter_online(self, queryset, name, value):
+        # online=True 는 sqlite 에서 'WHERE online' 으로 나가 (online, time) 인덱스의 등호 조건이 되지 않으므로 IN 으로 씁니다.
+        return queryset.filter(online__in=(value,))
+
+    def filter_instructor(self, queryset, name, value):
+        # UserSeminar 의 (user, seminar) 유니크 인덱스로 그 유저의 세미나만 읽습니다.
+        return queryset.filter(id__in=UserSeminar.objects.filter(
+            user_id=value, is_instructor=True
+        ).values('seminar_id'))
+
+
+class StableOrderingFilter(OrderingFilter):
+
+    # 같은 값이 여럿인 필드로 정렬해도 커서 페이지네이션의 순서가 요청마다 같도록 id 를 마지막 기준으로 붙입니다.
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering and ordering[0].startswith('-') else 'id')
+        return ordering
@@ -0,0 +1,94 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from common.benchmark import benchmark_database, percentile
+from seminar.fast_serializers import LIST_FIELDS, instructor_ids_of, seminar_detail_data, seminar_list_row
+from seminar.models import Seminar, UserSeminar
+from seminar.serializers import SeminarSerializer, SeminarViewSerializer
+from seminar.tests import SeminarFactory
+from user.models import User
+from user.test_user import UserFactory
+
+
+def seed(seminars, instructors, participants):
+    # (user, seminar) 는 유일하므로 세미나마다 같은 유저들을 강사 instructors 명, 수강생 participants 명으로 씁니다.
+    User.objects.bulk_create(UserFactory.build(email=f'user{i}@benchmark.com', username=f'user{i}')
+                             for i in range(instructors + participants))
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    Seminar.objects.bulk_create(SeminarFactory.build(name=f'세미나{i}', capacity=100, count=participants,
+                                                     time='19:00') for i in range(seminars))
+    UserSeminar.objects.bulk_create(
+        (UserSeminar(seminar_id=seminar_id, user_id=user_id, is_instructor=i < instructors)
+         for seminar_id in Seminar.objects.values_list('id', flat=True)
+         for i, user_id in enumerate(user_ids)),
+        batch_size=5000,
+    )
+
+
+def timed(func, repeat):
+    # func 를 repeat 번 불러 ms 단위 시간을 정렬해서 돌려줍니다.
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return sorted(durations)
+
+
+def compare(name, rows, drf, fast, repeat):
+    render = JSONRenderer().render
+    assert render(drf()) == render(fast()), f'{name}: 응답이 서로 다릅니다.'
+    drf_ms, fast_ms = timed(drf, repeat), timed(fast, repeat)
+    return {
+        'rows': rows,
+        'drf_us_per_row': round(percentile(drf_ms, 50) * 1000 / rows, 2),
+        'fast_us_per_row': round(percentile(fast_ms, 50) * 1000 / rows, 2),
+        'speedup': round(percentile(drf_ms, 50) / percentile(fast_ms, 50), 2),
+    }
+
+
+class Command(BaseCommand):
+
+    help = ('세미나 목록/상세 응답을 ModelSerializer 로 만들 때와 seminar/fast_serializers.py 로 만들 때의 '
+            '행당 직렬화 시간을 비교해 JSON 으로 출력합니다. 두 결과가 바이트 단위로 같은지도 확인합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seminars', type=int, default=1000)
+        parser.add_argument('--instructors', type=int, default=2, help='세미나마다 강사 수')
+        parser.add_argument('--participants', type=int, default=20, help='세미나마다 수강생 수')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            seed(options['seminars'], options['instructors'], options['participants'])
+
+            # 쿼리는 미리 끝내고, 이미 읽어온 행을 응답 dict 로 만드는 시간만 잽니다.
+            seminars = list(Seminar.objects.order_by('-created_at', '-id').prefetch_related(Prefetch(
+                'user_seminars', queryset=UserSeminar.objects.filter(is_instructor=True).order_by('id'),
+                to_attr='instructor_seminars'
+            )))
+            rows = list(Seminar.objects.order_by('-created_at', '-id').values(*LIST_FIELDS))
+            instructor_ids = instructor_ids_of([row['id'] for row in rows])
+            report = {'list': compare(
+                'list', len(rows),
+                lambda: SeminarViewSerializer(seminars, many=True).data,
+                lambda: [seminar_list_row(row['id'], row['name'], row['count'], instructor_ids[row['id']])
+                         for row in rows],
+                options['repeat'],
+            )}
+
+            # 상세 응답은 수강 정보를 읽는 쿼리까지 포함한 세미나 한 개 단위입니다.
+            seminar = seminars[0]
+            report['detail'] = compare(
+                'detail', 1,
+                lambda: SeminarSerializer(seminar).data,
+                lambda: seminar_detail_data(seminar.id),
+                options['repeat'],
+            )
+            report['options'] = {key: options[key] for key in ('seminars', 'instructors', 'participants', 'repeat')}
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from seminar.cache import invalidate_seminar
+from seminar.models import Seminar, UserSeminar
+
+
+def reconcile_seminar_count(dry_run=False):
+    # Seminar.count 는 수강 신청/드랍 시 F() 로만 갱신되므로, 수동으로 데이터를 고쳤거나
+    # 중간에 실패한 작업이 있으면 실제 수강 인원과 어긋날 수 있습니다.
+    # 어긋난 세미나를 한 번의 쿼리로 찾고, 한 번의 UPDATE 로 다시 맞춥니다.
+    drifted = list(
+        Seminar.objects.annotate(
+            active=Count('user_seminars', filter=Q(user_seminars__is_instructor=False, user_seminars__is_active=True))
+        ).exclude(count=F('active')).values_list('id', 'count', 'active')
+    )
+
+    if drifted and not dry_run:
+        active_count = UserSeminar.objects.filter(
+            seminar=OuterRef('pk'), is_instructor=False, is_active=True
+        ).values('seminar').annotate(cnt=Count('id')).values('cnt')
+        Seminar.objects.filter(id__in=[seminar_id for seminar_id, _, _ in drifted]).update(
+            count=Coalesce(Subquery(active_count), 0)
+        )
+        for seminar_id, _, _ in drifted:
+            invalidate_seminar(seminar_id)
+
+    return drifted
+
+
+class Command(BaseCommand):
+
+    help = 'Seminar.count 를 실제 수강 중인 인원과 맞추고, 어긋나 있던 세미나를 보고합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='고치지 않고 어긋난 세미나만 보고합니다.')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_seminar_count(dry_run=options['dry_run'])
+
+        for seminar_id, count, active in drifted:
+            self.stdout.write(f'seminar {seminar_id}: count={count}, active={active} (drift {count - active:+d})')
+
+        verb = 'found' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drifted)} drifted seminar(s)'))
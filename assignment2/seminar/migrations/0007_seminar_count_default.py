@@ -0,0 +1,31 @@
+# Generated by Django 3.2.6 on 2026-10-17 09:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_count(apps, schema_editor):
+    # 지금까지 제멋대로 들어가 있던 count 를 실제 수강 중인 인원으로 맞춰둡니다.
+    Seminar = apps.get_model('seminar', 'Seminar')
+    UserSeminar = apps.get_model('seminar', 'UserSeminar')
+    active_count = UserSeminar.objects.filter(
+        seminar=OuterRef('pk'), is_instructor=False, is_active=True
+    ).values('seminar').annotate(cnt=Count('id')).values('cnt')
+    Seminar.objects.update(count=Coalesce(Subquery(active_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seminar', '0006_alter_seminar_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='seminar',
+            name='count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_count, migrations.RunPython.noop),
+    ]
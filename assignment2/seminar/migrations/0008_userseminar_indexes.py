@@ -0,0 +1,35 @@
+# Generated by Django 3.2.6 on 2026-10-17 06:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('seminar', '0007_seminar_count_default'),
+    ]
+
+    operations = [
+        # 복합 인덱스를 먼저 만들어야 MySQL 에서 FK 가 쓰던 단일 컬럼 인덱스를 지울 수 있습니다.
+        migrations.AddIndex(
+            model_name='userseminar',
+            index=models.Index(fields=['seminar', 'is_instructor', 'is_active'], name='userseminar_seminar_role_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='userseminar',
+            constraint=models.UniqueConstraint(fields=('user', 'seminar'), name='unique_user_seminar'),
+        ),
+        migrations.AlterField(
+            model_name='userseminar',
+            name='seminar',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='user_seminars', to='seminar.seminar'),
+        ),
+        migrations.AlterField(
+            model_name='userseminar',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='user_seminars', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.6 on 2026-10-17 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seminar', '0008_userseminar_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='seminar',
+            index=models.Index(fields=['created_at'], name='seminar_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seminar',
+            index=models.Index(fields=['name'], name='seminar_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seminar',
+            index=models.Index(fields=['online', 'time'], name='seminar_online_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seminar',
+            index=models.Index(fields=['time'], name='seminar_time_idx'),
+        ),
+    ]
@@ -11,23 +11,45 @@ class Seminar(BaseModel):
 
     name = models.CharField(max_length=100, blank=False)
     capacity = models.PositiveIntegerField()
-    count = models.PositiveIntegerField()
+    # 현재 수강 중(is_active)인 수강생 수. 수강 신청/드랍 시 F() 로 갱신됩니다.
+    count = models.PositiveIntegerField(default=0)
     time = models.TimeField()
     online = models.BooleanField(blank=True, default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # 목록의 기본 정렬(커서 페이지네이션)은 created_at 으로, 검색 조건은 이름(같음, 접두어), (online, 시간 범위),
+        # 시간 범위로 찾습니다. 수강 신청마다 바뀌는 count 는 어느 인덱스에도 넣지 않습니다. (seminar/filters.py 참고)
+        indexes = [
+            models.Index(fields=['created_at'], name='seminar_created_at_idx'),
+            models.Index(fields=['name'], name='seminar_name_idx'),
+            models.Index(fields=['online', 'time'], name='seminar_online_time_idx'),
+            models.Index(fields=['time'], name='seminar_time_idx'),
+        ]
+
 
 class UserSeminar(BaseModel):
 
-    seminar = models.ForeignKey(Seminar, on_delete=models.CASCADE, related_name='user_seminars')
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_seminars')
+    # 두 FK 모두 아래 Meta 의 복합 인덱스/유니크 제약의 첫 컬럼이므로 단일 컬럼 인덱스는 따로 만들지 않습니다.
+    seminar = models.ForeignKey(Seminar, on_delete=models.CASCADE, related_name='user_seminars', db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='user_seminars', db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_instructor = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     dropped_at = models.DateTimeField(null=True)
 
+    class Meta:
+        # 수강생 수, 강사 목록 조회는 (seminar, is_instructor, is_active) 로,
+        # 중복 신청 확인과 드랍 대상 조회는 (user, seminar) 로 거릅니다.
+        indexes = [
+            models.Index(fields=['seminar', 'is_instructor', 'is_active'], name='userseminar_seminar_role_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'seminar'], name='unique_user_seminar'),
+        ]
+
 
 class ParticipantProfile(BaseModel):
 
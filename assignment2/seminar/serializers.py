@@ -1,7 +1,11 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
 from django.utils import timezone
 from rest_framework import serializers, status
 from rest_framework.exceptions import PermissionDenied, ValidationError
 
+from .cache import get_seminar_data, invalidate_seminar
 from .models import ParticipantProfile, InstructorProfile, Seminar, UserSeminar
 
 
@@ -73,16 +77,31 @@ class SeminarSerializer(serializers.ModelSerializer):
     class Meta:
         model = Seminar
         exclude = ('created_at', 'updated_at', )
+        read_only_fields = ('count', )
+
+    @staticmethod
+    def etag_fields():
+        # 상세 응답을 결정하는 값들입니다. (common/conditional.py 참고)
+        # count 는 F() UPDATE 로 바뀌어 updated_at 이 그대로이고, 수강 정보는 행이 지워질 수도 있으므로 개수도 함께 봅니다.
+        return ('id', 'updated_at', 'count'), {
+            'user_seminars_updated_at': Max('user_seminars__updated_at'),
+            'user_seminars_count': Count('user_seminars'),
+        }
 
     def get_participants(self, instance):
 
-        participants = ParticipantSerializer(instance.user_seminars.filter(is_instructor=False), many=True).data
+        participants = ParticipantSerializer(instance.user_seminars.filter(is_instructor=False).order_by('id'),
+                                             many=True).data
 
         return participants
 
     def get_instructors(self, instance):
 
-        instructors = InstructorSerializer(instance.user_seminars.filter(is_instructor=True), many=True).data
+        # 목록 조회에서는 SeminarViewSet.get_queryset 이 prefetch 해둔 결과를 사용합니다.
+        user_seminars = getattr(instance, 'instructor_seminars', None)
+        if user_seminars is None:
+            user_seminars = instance.user_seminars.filter(is_instructor=True).order_by('id')
+        instructors = InstructorSerializer(user_seminars, many=True).data
 
         return instructors
 
@@ -108,7 +127,7 @@ class SeminarSerializer(serializers.ModelSerializer):
             raise PermissionDenied('권한이 없습니다.')
 
         capacity = validated_data.get('capacity')
-        if capacity is not None and instance.user_seminars.filter(is_active=True, is_instructor=False).count() > capacity:
+        if capacity is not None and instance.count > capacity:
             raise serializers.ValidationError('이미 들어찬 정원보다 적게는 줄일 수 없어요')
         super().update(instance, validated_data)
 
@@ -128,7 +147,7 @@ class SeminarViewSerializer(SeminarSerializer):
 
     def get_participant_count(self, instance):
 
-        return instance.user_seminars.filter(is_instructor=False, is_active=True).count()
+        return instance.count
 
 
 class ParticipantSeminarSerializer(serializers.ModelSerializer):
@@ -174,20 +193,26 @@ class DropSeminarService(serializers.Serializer):
         if not seminar:
             return status.HTTP_404_NOT_FOUND, '세미나가 없습니다.'
 
-        if user.user_seminars.filter(seminar_id=seminar_id, is_instructor=True).exists():
-            return status.HTTP_403_FORBIDDEN, '강사는 드랍할 수 없어요'
-
-        # FIXME: common/models.py:6 참고
+        # (user, seminar) 는 유일하므로 한 번의 조회로 강사 여부까지 확인합니다.
         target = user.user_seminars.get_or_none(seminar_id=seminar_id)
 
+        if target and target.is_instructor:
+            return status.HTTP_403_FORBIDDEN, '강사는 드랍할 수 없어요'
+
         if not target:
             return status.HTTP_200_OK, '해당 세미나에 참여 중이지 않습니다.'
 
-        target.is_active = False
-        target.dropped_at = timezone.now()
-        target.save()
-
-        return status.HTTP_200_OK, SeminarSerializer(seminar).data
+        with transaction.atomic():
+            # 앞에서 읽은 is_active 로 정하면 동시에 드랍할 때 둘 다 count 를 줄이므로,
+            # 아직 참여 중인 행을 바꾼 요청 하나만 count 를 줄입니다.
+            now = timezone.now()
+            if UserSeminar.objects.filter(id=target.id, is_active=True).update(
+                is_active=False, dropped_at=now, updated_at=now
+            ):
+                Seminar.objects.filter(id=seminar_id).update(count=F('count') - 1)
+                # update() 는 post_save 시그널을 보내지 않으므로 상세 캐시를 직접 지웁니다.
+                invalidate_seminar(seminar_id)
+        return status.HTTP_200_OK, get_seminar_data(seminar.id)
 
 
 class RegisterSeminarService(serializers.Serializer):
@@ -208,27 +233,130 @@ class RegisterSeminarService(serializers.Serializer):
         if not hasattr(user, role):
             return status.HTTP_403_FORBIDDEN, f'{role} 프로필이 없습니다.'
 
-        if role == UserRole.PARTICIPANT:
-            if not user.participant.accepted:
-                return status.HTTP_403_FORBIDDEN, '수강생 등록 승인이 되지 않았습니다.'
-
-            if seminar.user_seminars.filter(is_instructor=False, is_active=True).count() == seminar.capacity:
-                return status.HTTP_400_BAD_REQUEST, '정원이 가득 찼습니다.'
-
-        if seminar.user_seminars.get_or_none(user=user):
-            return status.HTTP_400_BAD_REQUEST, '이미 참여중입니다.'
-
-        UserSeminar.objects.create(
-            seminar=seminar,
-            user=user,
-            is_instructor=(role == UserRole.INSTRUCTOR),
-        )
-        return status.HTTP_201_CREATED, SeminarSerializer(seminar).data
-
-
-
-
+        if role == UserRole.PARTICIPANT and not user.participant.accepted:
+            return status.HTTP_403_FORBIDDEN, '수강생 등록 승인이 되지 않았습니다.'
+
+        try:
+            with transaction.atomic():
+                # 이미 참여 중인지는 따로 조회하지 않고 (user, seminar) 유니크 제약으로 확인합니다.
+                UserSeminar.objects.create(
+                    seminar=seminar,
+                    user=user,
+                    is_instructor=(role == UserRole.INSTRUCTOR),
+                )
+
+                # 정원 확인과 자리 차지를 조건부 UPDATE 한 번으로 처리합니다.
+                # COUNT 후 INSERT 하는 방식은 동시에 신청이 몰리면 정원을 넘겨 받게 됩니다.
+                if role == UserRole.PARTICIPANT and not Seminar.objects.filter(
+                    id=seminar.id, count__lt=F('capacity')
+                ).update(count=F('count') + 1):
+                    transaction.set_rollback(True)
+                    return status.HTTP_400_BAD_REQUEST, '정원이 가득 찼습니다.'
+        except IntegrityError:
+            # (user, seminar) 유니크 제약 때문인 경우만 이미 참여 중인 것이고, 다른 제약 위반은 그대로 올립니다.
+            if UserSeminar.objects.filter(user=user, seminar=seminar).exists():
+                return status.HTTP_400_BAD_REQUEST, '이미 참여중입니다.'
+            raise
+
+        return status.HTTP_201_CREATED, get_seminar_data(seminar.id)
+
+
+class BulkRegisterSeminarService(serializers.Serializer):
+
+    # 수강생 명단을 한 번에 등록합니다. 유저 id 또는 이메일 목록을 받아 자격 확인과 중복 확인은 집합 단위 쿼리로,
+    # 정원 확인은 RegisterSeminarService 와 같이 조건부 UPDATE 로, 등록은 bulk_create 한 번으로 처리합니다.
+    # 자리가 모자라면 요청한 순서대로 남은 자리만큼 등록하고 나머지는 정원 초과로 돌려줍니다.
+
+    MAX_USERS = 1000
+
+    role = serializers.ChoiceField(choices=UserRole.choices, default=UserRole.PARTICIPANT)
+    users = serializers.ListField(child=serializers.CharField(), allow_empty=False, max_length=MAX_USERS)
+
+    def find_users(self, keys):
+        ids = {int(key) for key in keys if key.isdigit()}
+        emails = {key for key in keys if not key.isdigit()}
+        users = get_user_model().objects.filter(Q(id__in=ids) | Q(email__in=emails)).select_related(
+            'participant', 'instructor')
+        by_key = {}
+        for user in users:
+            by_key[str(user.id)] = by_key[user.email] = user
+        return by_key
+
+    def reserve(self, seminar_id, wanted):
+        # 남은 자리만큼(최대 wanted) 정원을 차지하고 차지한 수를 돌려줍니다. 트랜잭션 안에서 호출합니다.
+        # 대부분은 자리가 넉넉하므로 먼저 조건부 UPDATE 로 한 번에 차지해봅니다. 이 UPDATE 가 세미나 행(SQLite 는 DB)의
+        # 쓰기 잠금을 먼저 잡으므로, 실패해서 남은 자리를 읽고 다시 UPDATE 하는 동안 다른 신청이 끼어들지 못합니다.
+        seminars = Seminar.objects.filter(id=seminar_id)
+        if seminars.filter(count__lte=F('capacity') - wanted).update(count=F('count') + wanted):
+            return wanted
+
+        seminar = seminars.select_for_update().values('count', 'capacity').get()
+        seats = min(wanted, seminar['capacity'] - seminar['count'])
+        if seats <= 0 or not seminars.filter(count__lte=F('capacity') - seats).update(count=F('count') + seats):
+            return 0
+        return seats
 
+    def execute(self):
 
+        self.is_valid(raise_exception=True)
+        seminar_id = self.context.get('seminar_id')
+        role = self.validated_data['role']
+        keys = self.validated_data['users']
+        user = self.context.get('request').user
+        seminar = Seminar.objects.get_or_none(id=seminar_id)
 
+        if not seminar:
+            return status.HTTP_404_NOT_FOUND, '그런 세미나는 없습니다.'
 
+        if not (user.is_staff or user.user_seminars.filter(seminar_id=seminar.id, is_instructor=True).exists()):
+            return status.HTTP_403_FORBIDDEN, '세미나 담당 강사만 일괄 등록할 수 있습니다.'
+
+        users = self.find_users(keys)
+        enrolled = set(seminar.user_seminars.filter(user_id__in={target.id for target in users.values()})
+                       .values_list('user_id', flat=True))
+
+        results, candidates = [], []
+        for key in keys:
+            target = users.get(key)
+            result = {'user': key, 'id': target and target.id}
+            results.append(result)
+            if not target:
+                result.update({'status': status.HTTP_404_NOT_FOUND, 'message': '그런 유저는 없습니다.'})
+            elif not hasattr(target, role):
+                result.update({'status': status.HTTP_403_FORBIDDEN, 'message': f'{role} 프로필이 없습니다.'})
+            elif role == UserRole.PARTICIPANT and not target.participant.accepted:
+                result.update({'status': status.HTTP_403_FORBIDDEN, 'message': '수강생 등록 승인이 되지 않았습니다.'})
+            elif target.id in enrolled:
+                result.update({'status': status.HTTP_400_BAD_REQUEST, 'message': '이미 참여중입니다.'})
+            else:
+                # 같은 유저를 id 와 이메일로 두 번 적었을 수도 있으므로 처음 것만 등록합니다.
+                enrolled.add(target.id)
+                candidates.append((result, target))
+
+        try:
+            with transaction.atomic():
+                if role == UserRole.PARTICIPANT and candidates:
+                    seats = self.reserve(seminar.id, len(candidates))
+                    for result, _ in candidates[seats:]:
+                        result.update({'status': status.HTTP_400_BAD_REQUEST, 'message': '정원이 가득 찼습니다.'})
+                    candidates = candidates[:seats]
+
+                UserSeminar.objects.bulk_create([
+                    UserSeminar(seminar=seminar, user=target, is_instructor=(role == UserRole.INSTRUCTOR))
+                    for _, target in candidates
+                ])
+        except IntegrityError:
+            # 확인한 뒤 그 사이에 따로 신청한 유저가 있는 경우입니다. 차지한 정원도 함께 되돌려지므로 다시 요청하면 됩니다.
+            return status.HTTP_409_CONFLICT, '그 사이에 이미 참여한 유저가 있습니다. 다시 시도해주세요.'
+
+        for result, _ in candidates:
+            result.update({'status': status.HTTP_201_CREATED})
+
+        # bulk_create 와 update 는 시그널을 보내지 않으므로 세미나 캐시를 직접 지웁니다.
+        if candidates:
+            invalidate_seminar(seminar.id)
+        return status.HTTP_201_CREATED if candidates else status.HTTP_400_BAD_REQUEST, {
+            'enrolled': len(candidates),
+            'results': results,
+            'seminar': get_seminar_data(seminar.id),
+        }
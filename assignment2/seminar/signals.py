@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from seminar.cache import invalidate_seminar
+from seminar.models import Seminar, UserSeminar
+
+
+@receiver(post_save, sender=Seminar)
+@receiver(post_delete, sender=Seminar)
+def invalidate_seminar_on_seminar_change(sender, instance, **kwargs):
+    invalidate_seminar(instance.id)
+
+
+@receiver(post_save, sender=UserSeminar)
+@receiver(post_delete, sender=UserSeminar)
+def invalidate_seminar_on_user_seminar_change(sender, instance, **kwargs):
+    invalidate_seminar(instance.seminar_id)
@@ -1,10 +1,29 @@
-from django.test import TestCase
+import json
+import threading
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F, Prefetch
+
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from unittest import mock, skipUnless
 from django.utils import timezone
 
 from factory.django import DjangoModelFactory
 from rest_framework import status
-
-from seminar.models import Seminar, UserSeminar
+from rest_framework.renderers import JSONRenderer
+
+from common.models import BaseManager
+from seminar.filters import SeminarFilter
+from seminar.models import ParticipantProfile, Seminar, UserSeminar
+from seminar.fast_serializers import LIST_FIELDS, seminar_detail_data, seminar_list_data
+from seminar.serializers import BulkRegisterSeminarService, RegisterSeminarService, SeminarSerializer, \
+    SeminarViewSerializer
+from user.models import User
+from user.serializers import jwt_token_of
 from user.test_user import UserFactory
 
 
@@ -21,12 +40,14 @@ class SeminarTest(TestCase):
         cls.participant = UserFactory(email='student@test.com', is_participant=True)
         cls.instructor = UserFactory(email='instructor@test.com', is_instructor=True)
         cls.both = UserFactory(email='both@test.com', is_participant=True, is_instructor=True)
-        cls.seminar = SeminarFactory(name='세미나', capacity=100, count=100, time=timezone.now().time())
+        cls.seminar = SeminarFactory(name='세미나', capacity=100, time=timezone.now().time())
         UserSeminar.objects.create(
             user=cls.instructor, seminar=cls.seminar, is_instructor=True
         )
 
     def setUp(self):
+        # 테스트가 끝나면 DB 는 롤백되지만 캐시는 남아있으므로 비워줍니다.
+        cache.clear()
         self.post_data = {
             'name': '세미나',
             'capacity': 1,
@@ -147,4 +168,519 @@ class SeminarTest(TestCase):
         response = client.post('/api/v1/seminar/1/user/', data=data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_seminar_정원_수강인원_카운터(self):
+
+        client = self.client
+        client.force_login(self.both)
+        data = {'role': 'participant'}
+
+        client.post('/api/v1/seminar/1/user/', data=data)
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.count, 1)
+
+        response = client.get('/api/v1/seminar/')
+        self.assertEqual(response.data['results'][0]['participant_count'], 1)
+
+        client.delete('/api/v1/seminar/1/user/', data=data, content_type='application/json')
+        client.delete('/api/v1/seminar/1/user/', data=data, content_type='application/json')
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.count, 0)
+
+    def test_seminar_동시_드랍_카운터(self):
+
+        client = self.client
+        client.force_login(self.both)
+        client.post('/api/v1/seminar/1/user/', data={'role': 'participant'})
+
+        get_or_none = BaseManager.get_or_none
+
+        def dropped_concurrently(manager, *args, **kwargs):
+            # 드랍할 행을 읽은 직후 다른 요청이 먼저 드랍한 상황을 만듭니다.
+            found = get_or_none(manager, *args, **kwargs)
+            if isinstance(found, UserSeminar) and found.is_active:
+                UserSeminar.objects.filter(id=found.id).update(is_active=False)
+                Seminar.objects.filter(id=found.seminar_id).update(count=F('count') - 1)
+            return found
+
+        with mock.patch.object(BaseManager, 'get_or_none', dropped_concurrently):
+            response = client.delete('/api/v1/seminar/1/user/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.count, 0)
+
+    def test_reconcile_seminar_count(self):
+
+        UserSeminar.objects.create(user=self.participant, seminar=self.seminar)
+        Seminar.objects.filter(id=self.seminar.id).update(count=5)
+
+        out = StringIO()
+        call_command('reconcile_seminar_count', '--dry-run', stdout=out)
+        self.assertIn(f'seminar {self.seminar.id}: count=5, active=1 (drift +4)', out.getvalue())
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.count, 5)
+
+        out = StringIO()
+        call_command('reconcile_seminar_count', stdout=out)
+        self.assertIn('fixed 1 drifted seminar(s)', out.getvalue())
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.count, 1)
+
+    def test_get_seminar_캐시(self):
+
+        client = self.client
+        client.force_login(self.both)
+
+        response = client.get(f'/api/v1/seminar/{self.seminar.id}/')
+        self.assertEqual(response.data['participants'], [])
+
+        # 캐시된 응답은 세션, 유저 조회 외에 쿼리가 나가지 않습니다.
+        with self.assertNumQueries(2):
+            cached = client.get(f'/api/v1/seminar/{self.seminar.id}/')
+        self.assertEqual(cached.json(), response.json())
+
+        # 수강 신청으로 UserSeminar 가 생기면 캐시가 지워지고 새 응답이 캐시됩니다.
+        client.post(f'/api/v1/seminar/{self.seminar.id}/user/', data={'role': 'participant'})
+        response = client.get(f'/api/v1/seminar/{self.seminar.id}/')
+        self.assertEqual(len(response.data['participants']), 1)
+        self.assertEqual(response.data['count'], 1)
+
+        client.force_login(self.instructor)
+        client.put(f'/api/v1/seminar/{self.seminar.id}/', {'name': '컴구'}, content_type='application/json')
+        response = client.get(f'/api/v1/seminar/{self.seminar.id}/')
+        self.assertEqual(response.data['name'], '컴구')
+
+        client.force_login(UserFactory(email='admin@test.com', is_staff=True))
+        response = client.get('/api/v1/seminar/cache_stats/')
+        # 첫 조회, 수강 신청 응답, 수정 후 조회는 miss / 나머지 두 번은 hit
+        self.assertEqual(response.data['hit'], 2)
+        self.assertEqual(response.data['miss'], 3)
+
+    def test_get_seminar_조건부_요청(self):
+
+        client = self.client
+        client.force_login(self.both)
+
+        response = client.get(f'/api/v1/seminar/{self.seminar.id}/')
+        etag = response['ETag']
+
+        # 좌석 현황을 폴링하는 클라이언트는 바뀐 것이 없으면 세션, 유저 조회 외에 쿼리 없이 304 를 받습니다.
+        with self.assertNumQueries(2):
+            response = client.get(f'/api/v1/seminar/{self.seminar.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # 캐시가 비어 있어도 ETag 는 작은 쿼리 한 번으로 계산합니다.
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = client.get(f'/api/v1/seminar/{self.seminar.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # 수강 신청, 드랍, 정원 보정처럼 count 만 UPDATE 되는 경우에도 ETag 가 바뀝니다.
+        client.post(f'/api/v1/seminar/{self.seminar.id}/user/', data={'role': 'participant'})
+        response = client.get(f'/api/v1/seminar/{self.seminar.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+        etag = response['ETag']
+        client.delete(f'/api/v1/seminar/{self.seminar.id}/user/')
+        response = client.get(f'/api/v1/seminar/{self.seminar.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        Seminar.objects.filter(id=self.seminar.id).update(count=5)
+        call_command('reconcile_seminar_count', stdout=StringIO())
+        response = client.get(f'/api/v1/seminar/{self.seminar.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = client.get('/api/v1/seminar/0/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(client.get('/api/v1/seminar/abc/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class UserSeminarIndexTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory(email='student@test.com', is_participant=True)
+        cls.seminar = SeminarFactory(name='세미나', capacity=10, time=timezone.now().time())
+        UserSeminar.objects.create(user=cls.user, seminar=cls.seminar)
+
+    @skipUnless(connection.vendor == 'sqlite', 'sqlite 의 실행 계획 문구를 확인합니다.')
+    def test_수강인원_조회_인덱스(self):
+        plan = UserSeminar.objects.filter(seminar=self.seminar, is_instructor=False, is_active=True).explain()
+        self.assertIn('userseminar_seminar_role_idx', plan)
+
+        plan = UserSeminar.objects.filter(seminar__in=[self.seminar], is_instructor=True).explain()
+        self.assertIn('userseminar_seminar_role_idx', plan)
+
+    @skipUnless(connection.vendor == 'sqlite', 'sqlite 의 실행 계획 문구를 확인합니다.')
+    def test_유저_세미나_조회_인덱스(self):
+        # sqlite 는 유니크 제약을 테이블 정의에 넣으므로 인덱스 이름 대신 두 컬럼을 모두 쓰는지 확인합니다.
+        plan = UserSeminar.objects.filter(user=self.user, seminar=self.seminar).explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertIn('user_id=? AND seminar_id=?', plan)
+
+    def test_중복_신청_유니크_제약(self):
+        client = self.client
+        client.force_login(self.user)
+
+        # 중복 확인용 SELECT 없이, INSERT 가 유니크 제약에 걸리면 롤백 후 400 을 돌려줍니다.
+        response = client.post(f'/api/v1/seminar/{self.seminar.id}/user/', data={'role': 'participant'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, '이미 참여중입니다.')
+        self.assertEqual(UserSeminar.objects.filter(user=self.user).count(), 1)
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.count, 0)
+
+    def test_다른_제약_위반은_그대로(self):
+        other = UserFactory(email='other@test.com', is_participant=True)
+        service = RegisterSeminarService(data={'role': 'participant'},
+                                         context={'request': SimpleNamespace(user=other), 'seminar_id': self.seminar.id})
+        error = IntegrityError('FOREIGN KEY constraint failed')
+        with mock.patch.object(UserSeminar.objects, 'create', side_effect=error), self.assertRaises(IntegrityError):
+            service.execute()
+
 
+class SeminarListQueryTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.participant = UserFactory(email='student@test.com', is_participant=True)
+        cls.instructor = UserFactory(email='instructor@test.com', is_instructor=True)
+
+    def create_seminars(self, n):
+        Seminar.objects.bulk_create(
+            SeminarFactory.build(name=f'세미나{i}', capacity=10, count=1, time=timezone.now().time())
+            for i in range(n)
+        )
+        # bulk_create 가 pk 를 채워주지 않는 DB(sqlite, mysql)가 있으므로 다시 조회합니다.
+        seminars = Seminar.objects.order_by('-id')[:n]
+        UserSeminar.objects.bulk_create(
+            UserSeminar(seminar=seminar, user=self.instructor, is_instructor=True) for seminar in seminars
+        )
+        UserSeminar.objects.bulk_create(
+            UserSeminar(seminar=seminar, user=self.participant) for seminar in seminars
+        )
+
+    def test_get_seminar_list_쿼리수_고정(self):
+        client = self.client
+        client.force_login(self.participant)
+
+        created = 0
+        for total in (10, 1000, 10000):
+            self.create_seminars(total - created)
+            created = total
+
+            # 세션 + 유저 + 세미나 목록 + 강사 목록
+            with self.assertNumQueries(4):
+                response = client.get('/api/v1/seminar/')
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results = response.data['results']
+            self.assertEqual(len(results), min(total, 20))
+            self.assertEqual(results[0]['participant_count'], 1)
+            self.assertEqual(len(results[0]['instructors']), 1)
+
+    def test_get_seminar_list_페이지네이션(self):
+        client = self.client
+        client.force_login(self.participant)
+        self.create_seminars(25)
+
+        seen, url = [], '/api/v1/seminar/?page_size=10'
+        while url:
+            # 깊은 페이지도 첫 페이지와 같은 수의 쿼리로 응답합니다.
+            with self.assertNumQueries(4):
+                response = client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [seminar['id'] for seminar in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(set(seen), reverse=True))
+
+    def test_get_seminar_list_스트리밍(self):
+        client = self.client
+        client.force_login(self.participant)
+        self.create_seminars(30)
+
+        response = client.get('/api/v1/seminar/?stream=ndjson')
+        seminars = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(len(seminars), 30)
+        self.assertEqual(seminars[0]['participant_count'], 1)
+        self.assertEqual(len(seminars[0]['instructors']), 1)
+        self.assertEqual([seminar['id'] for seminar in seminars], sorted(seminar['id'] for seminar in seminars)[::-1])
+
+    def test_get_seminar_list_최대_페이지_크기(self):
+        client = self.client
+        client.force_login(self.participant)
+        self.create_seminars(150)
+
+        response = client.get('/api/v1/seminar/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 100)
+
+
+class SeminarFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = UserFactory(email='instructor@test.com', is_instructor=True)
+        cls.other = UserFactory(email='other@test.com', is_instructor=True)
+        rows = [
+            ('장고 기초', True, '09:00'),
+            ('장고 심화', False, '10:30'),
+            ('스프링 기초', True, '13:00'),
+            ('리액트', True, '19:00'),
+            ('Django', False, '21:00'),
+        ]
+        cls.seminars = {
+            name: SeminarFactory(name=name, capacity=10, online=online, time=time) for name, online, time in rows
+        }
+        for name in ('장고 기초', '리액트'):
+            UserSeminar.objects.create(seminar=cls.seminars[name], user=cls.instructor, is_instructor=True)
+        UserSeminar.objects.create(seminar=cls.seminars['장고 심화'], user=cls.instructor)
+        UserSeminar.objects.create(seminar=cls.seminars['스프링 기초'], user=cls.other, is_instructor=True)
+
+    def setUp(self):
+        self.client.force_login(self.instructor)
+
+    def names(self, query):
+        response = self.client.get(f'/api/v1/seminar/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [seminar['name'] for seminar in response.data['results']]
+
+    def test_이름(self):
+        self.assertEqual(self.names('name=리액트'), ['리액트'])
+        self.assertEqual(self.names('name_prefix=장고&ordering=name'), ['장고 기초', '장고 심화'])
+        self.assertEqual(self.names('name_contains=기초&ordering=name'), ['스프링 기초', '장고 기초'])
+        self.assertEqual(self.names('name_contains=django'), ['Django'])
+
+    def test_온라인_시간(self):
+        self.assertEqual(self.names('online=false&ordering=time'), ['장고 심화', 'Django'])
+        self.assertEqual(self.names('time_after=10:00&time_before=19:00&ordering=time'),
+                         ['장고 심화', '스프링 기초', '리액트'])
+        self.assertEqual(self.names('online=true&time_before=13:00&ordering=-time'), ['스프링 기초', '장고 기초'])
+
+    def test_강사(self):
+        # 수강생으로만 들은 세미나는 빠집니다.
+        self.assertEqual(self.names(f'instructor={self.instructor.id}&ordering=name'), ['리액트', '장고 기초'])
+        self.assertEqual(self.names(f'instructor={self.other.id}'), ['스프링 기초'])
+
+    def test_정렬_페이지네이션(self):
+        seen, url = [], '/api/v1/seminar/?ordering=-name&page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen += [seminar['name'] for seminar in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, sorted(self.seminars, reverse=True))
+
+    def test_스트리밍(self):
+        response = self.client.get('/api/v1/seminar/?stream=ndjson&online=true&ordering=time')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['name'] for row in rows], ['장고 기초', '스프링 기초', '리액트'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'sqlite 의 실행 계획 문구를 확인합니다.')
+    def test_인덱스(self):
+        def plan(params):
+            return SeminarFilter(params, queryset=Seminar.objects.all()).qs.explain()
+
+        self.assertIn('seminar_name_idx', plan({'name_prefix': '장고'}))
+        self.assertIn('seminar_online_time_idx', plan({'online': 'true', 'time_after': '10:00'}))
+        self.assertIn('seminar_time_idx', plan({'time_after': '10:00', 'time_before': '12:00'}))
+        # (user, seminar) 유니크 제약의 인덱스 (sqlite 에서는 sqlite_autoindex_... 로 보입니다.)
+        self.assertIn('(user_id=?)', plan({'instructor': self.instructor.id}))
+
+
+class FastSerializerTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [UserFactory(email=f'user{i}@test.com', is_instructor=True, is_participant=True) for i in range(4)]
+        cls.seminars = [
+            Seminar.objects.create(name='강사 없음', capacity=10, time='09:30', online=False),
+            Seminar.objects.create(name='세미나', capacity=30, count=2, time='19:00'),
+        ]
+        seminar = cls.seminars[1]
+        UserSeminar.objects.create(seminar=seminar, user=users[2], is_instructor=True)
+        UserSeminar.objects.create(seminar=seminar, user=users[0])
+        UserSeminar.objects.create(seminar=seminar, user=users[3], is_instructor=True)
+        UserSeminar.objects.create(seminar=seminar, user=users[1], is_active=False)
+
+    def assertSameJSON(self, drf, fast):
+        render = JSONRenderer().render
+        self.assertEqual(render(fast), render(drf))
+
+    def test_목록_같은_JSON(self):
+        seminars = Seminar.objects.order_by('-created_at', '-id')
+        drf = SeminarViewSerializer(seminars.prefetch_related(Prefetch(
+            'user_seminars', queryset=UserSeminar.objects.filter(is_instructor=True).order_by('id'),
+            to_attr='instructor_seminars'
+        )), many=True).data
+        with self.assertNumQueries(2):
+            fast = seminar_list_data(list(seminars.values(*LIST_FIELDS)))
+        self.assertSameJSON(drf, fast)
+
+        response = self.client.get('/api/v1/seminar/', HTTP_AUTHORIZATION='JWT ' + jwt_token_of(User.objects.first()))
+        self.assertEqual(response.content, JSONRenderer().render({'next': None, 'previous': None, 'results': drf}))
+
+    def test_상세_같은_JSON(self):
+        for seminar in self.seminars:
+            with self.assertNumQueries(2):
+                fast = seminar_detail_data(seminar.id)
+            self.assertSameJSON(SeminarSerializer(seminar).data, fast)
+        self.assertIsNone(seminar_detail_data(0))
+
+
+class BulkRegisterSeminarTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = UserFactory(email='inst@test.com', username='inst', password='inst', is_instructor=True)
+        cls.other = UserFactory(email='other@test.com', username='other', password='other', is_instructor=True)
+        cls.seminar = SeminarFactory(name='세미나', capacity=5, time=timezone.now().time())
+        UserSeminar.objects.create(user=cls.instructor, seminar=cls.seminar, is_instructor=True)
+
+        User.objects.bulk_create(User(email=f'student{i}@test.com', username=f'student{i}') for i in range(10))
+        cls.students = list(User.objects.filter(email__startswith='student').order_by('id'))
+        ParticipantProfile.objects.bulk_create(ParticipantProfile(user=user) for user in cls.students)
+
+    def setUp(self):
+        cache.clear()
+
+    def bulk_register(self, users, user=None, **data):
+        return self.client.post(f'/api/v1/seminar/{self.seminar.id}/user/bulk/', data={'users': users, **data},
+                                content_type='application/json',
+                                HTTP_AUTHORIZATION='JWT ' + jwt_token_of(user or self.instructor))
+
+    def test_담당_강사만_가능(self):
+        response = self.bulk_register([self.students[0].id], user=self.other)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_일괄_등록(self):
+        s = self.students
+        ParticipantProfile.objects.filter(user=s[2]).update(accepted=False)
+        UserSeminar.objects.create(user=s[3], seminar=self.seminar)
+        Seminar.objects.filter(id=self.seminar.id).update(count=1)
+
+        users = [s[0].id, s[1].email, s[2].id, s[3].id, 'nobody@test.com', self.other.id, s[0].email]
+        response = self.bulk_register(users)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['enrolled'], 2)
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 201, 403, 400, 404, 403, 400])
+        self.assertEqual(response.data['results'][1]['id'], s[1].id)
+        self.assertEqual(response.data['seminar']['count'], 3)
+        self.assertEqual(len(response.data['seminar']['participants']), 3)
+
+    def test_일괄_등록_정원(self):
+        # 남은 4자리는 요청한 순서대로 채우고 나머지는 정원 초과로 돌려줍니다.
+        Seminar.objects.filter(id=self.seminar.id).update(count=1)
+        response = self.bulk_register([student.id for student in self.students])
+
+        self.assertEqual([result['status'] for result in response.data['results']], [201] * 4 + [400] * 6)
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.count, 5)
+        self.assertEqual(self.seminar.user_seminars.filter(is_instructor=False).count(), 4)
+
+        response = self.bulk_register([self.students[9].id])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['enrolled'], 0)
+
+    def test_일괄_등록_쿼리수(self):
+        Seminar.objects.filter(id=self.seminar.id).update(capacity=100)
+        get = self.client.get(f'/api/v1/seminar/{self.seminar.id}/', HTTP_AUTHORIZATION='JWT ' + jwt_token_of(self.instructor))
+        self.assertEqual(get.data['count'], 0)
+
+        # 인원 수와 상관없이 세미나, 권한, 유저, 기존 참여, 정원 UPDATE, bulk_create, 상세 응답 2번 (+ savepoint 2번)
+        with self.assertNumQueries(10):
+            response = self.bulk_register([student.id for student in self.students])
+        self.assertEqual(response.data['enrolled'], 10)
+        # bulk_create 는 시그널을 보내지 않지만 캐시된 상세 응답은 지워져 있어야 합니다.
+        self.assertEqual(response.data['seminar']['count'], 10)
+        get = self.client.get(f'/api/v1/seminar/{self.seminar.id}/', HTTP_AUTHORIZATION='JWT ' + jwt_token_of(self.instructor))
+        self.assertEqual(len(get.data['participants']), 10)
+
+    def test_강사_일괄_등록(self):
+        response = self.bulk_register([self.other.email], role='instructor')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.seminar.refresh_from_db()
+        self.assertEqual(self.seminar.count, 0)
+        self.assertTrue(self.seminar.user_seminars.filter(user=self.other, is_instructor=True).exists())
+
+
+class RegisterSeminarConcurrencyTest(TransactionTestCase):
+
+    capacity = 30
+    n_users = 300
+
+    def setUp(self):
+        self.seminar = SeminarFactory(name='세미나', capacity=self.capacity, time=timezone.now().time())
+        User.objects.bulk_create(
+            User(email=f'student{i}@test.com', username=f'student{i}') for i in range(self.n_users)
+        )
+        self.users = list(User.objects.all())
+        ParticipantProfile.objects.bulk_create(ParticipantProfile(user=user) for user in self.users)
+
+    def register(self, user, barrier, results):
+        try:
+            barrier.wait()
+            service = RegisterSeminarService(
+                data={'role': 'participant'},
+                context={'request': SimpleNamespace(user=user), 'seminar_id': self.seminar.id}
+            )
+            status_code, _ = service.execute()
+            results.append(status_code)
+        finally:
+            connection.close()
+
+    def test_동시_수강신청_정원초과_없음(self):
+        barrier, results = threading.Barrier(self.n_users), []
+        threads = [
+            threading.Thread(target=self.register, args=(user, barrier, results))
+            for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.seminar.refresh_from_db()
+        active = self.seminar.user_seminars.filter(is_instructor=False, is_active=True).count()
+
+        self.assertEqual(len(results), self.n_users)
+        self.assertEqual(results.count(status.HTTP_201_CREATED), self.capacity)
+        self.assertEqual(results.count(status.HTTP_400_BAD_REQUEST), self.n_users - self.capacity)
+        self.assertEqual(active, self.capacity)
+        self.assertEqual(self.seminar.count, self.capacity)
+
+    def bulk_register(self, users, barrier, results):
+        try:
+            barrier.wait()
+            service = BulkRegisterSeminarService(
+                data={'role': 'participant', 'users': [str(user.id) for user in users]},
+                context={'request': SimpleNamespace(user=self.staff), 'seminar_id': self.seminar.id}
+            )
+            status_code, data = service.execute()
+            if status_code != status.HTTP_409_CONFLICT:
+                results.extend(result['status'] for result in data['results'])
+        finally:
+            connection.close()
+
+    def test_동시_일괄_등록_정원초과_없음(self):
+        # 일괄 등록 10건(각 10명)과 개별 신청 200건이 동시에 몰려도 정원을 넘지 않습니다.
+        self.staff = User.objects.create(email='staff@test.com', username='staff', is_staff=True)
+        bulk, single = [self.users[i:i + 10] for i in range(0, 100, 10)], self.users[100:]
+        barrier, results = threading.Barrier(len(bulk) + len(single)), []
+        threads = [threading.Thread(target=self.bulk_register, args=(users, barrier, results)) for users in bulk]
+        threads += [threading.Thread(target=self.register, args=(user, barrier, results)) for user in single]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.seminar.refresh_from_db()
+        active = self.seminar.user_seminars.filter(is_instructor=False, is_active=True).count()
+
+        self.assertEqual(results.count(status.HTTP_201_CREATED), active)
+        self.assertLessEqual(active, self.capacity)
+        self.assertEqual(self.seminar.count, active)
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
-from .views import query_practice, SeminarViewSet, UserSeminarView
+from .views import query_practice, SeminarViewSet, UserSeminarView, BulkUserSeminarView
 
 router = SimpleRouter()
 router.register('seminar', SeminarViewSet, basename='seminar')
@@ -9,5 +9,6 @@ router.register('seminar', SeminarViewSet, basename='seminar')
 urlpatterns = [
     path('', include(router.urls)),
     path('seminar/<seminar_id>/user/', UserSeminarView.as_view()),
+    path('seminar/<seminar_id>/user/bulk/', BulkUserSeminarView.as_view()),
     path('query_practice/', query_practice)
 ]
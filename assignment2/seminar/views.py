@@ -5,8 +5,8 @@ from django.db.models import Q, F
 from django.utils import timezone
 
 from django.shortcuts import render
-from rest_framework import status, serializers
-from rest_framework.decorators import api_view
+from rest_framework import permissions, status, serializers
+from rest_framework.decorators import action, api_view
 from django.contrib.auth import get_user_model
 
 # Create your views here.
@@ -14,35 +14,59 @@ from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.views import APIView
 
+from common.conditional import not_modified, object_id
+from common.pagination import CreatedAtCursorPagination
+from common.streaming import StreamingListMixin
+from seminar.cache import get_seminar_data, get_seminar_etag, seminar_cache_stats
+from seminar.fast_serializers import LIST_FIELDS, seminar_list_data
+from seminar.filters import SeminarFilter, StableOrderingFilter
 from seminar.models import Seminar, UserSeminar
-from seminar.serializers import SeminarSerializer, SeminarViewSerializer, RegisterSeminarService, DropSeminarService
+from seminar.serializers import SeminarSerializer, RegisterSeminarService, DropSeminarService, \
+    BulkRegisterSeminarService
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import OrderingFilter
 
 from survey.models import SurveyResult
 
 
-class SeminarViewSet(GenericViewSet):
+class SeminarViewSet(StreamingListMixin, GenericViewSet):
     serializer_class = SeminarSerializer
     queryset = Seminar.objects.all()
-    filter_backends = (DjangoFilterBackend, OrderingFilter,)
-    filter_fields = ('name',)
-    ordering_fields = ('created_at',)
+    # ?name_prefix=, ?online=, ?time_after=&time_before=, ?instructor=, ?ordering=name 등 (seminar/filters.py 참고)
+    filter_backends = (DjangoFilterBackend, StableOrderingFilter,)
+    filterset_class = SeminarFilter
+    ordering_fields = ('created_at', 'name', 'time')
+    ordering = CreatedAtCursorPagination.ordering
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # 목록은 모델 인스턴스 대신 .values() 행으로 읽고, 강사 목록은 페이지(스트리밍은 chunk)마다 쿼리 한 번으로 붙입니다.
+            # 수강생 수는 Seminar.count 를 그대로 씁니다. (seminar/fast_serializers.py 참고)
+            queryset = queryset.values(*LIST_FIELDS)
+        return queryset
 
     def list(self, request):
-        serializer = SeminarViewSerializer
-        sz = serializer(self.queryset, many=True)
-        print(sz.context)
-        return Response(sz.data)
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.get_stream_format():
+            return self.stream_list_chunks(queryset, seminar_list_data)
+
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(seminar_list_data(page))
 
     def retrieve(self, request, pk=None):
 
-        try:
-            seminar = Seminar.objects.get(id=pk)
-        except Seminar.DoesNotExist:
+        # 클라이언트가 가진 응답이 그대로라면 본문 없이 304 를 돌려줍니다. (common/conditional.py 참고)
+        pk = object_id(pk)
+        etag = get_seminar_etag(pk)
+        if (response := not_modified(request, etag)) is not None:
+            return response
+
+        # 캐시에 있으면 세미나를 조회하지 않고 바로 응답합니다. (seminar/cache.py 참고)
+        if etag is None or (data := get_seminar_data(pk)) is None:
             return Response(status=status.HTTP_404_NOT_FOUND, data='그런 세미나는 없습니다')
 
-        return Response(self.get_serializer(seminar).data)
+        return Response(data, headers={'ETag': etag})
 
     def create(self, request):
 
@@ -69,6 +93,10 @@ class SeminarViewSet(GenericViewSet):
 
         return Response(self.get_serializer(seminar).data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['GET'], permission_classes=(permissions.IsAdminUser, ))
+    def cache_stats(self, request):
+        return Response(seminar_cache_stats())
+
 
 class UserSeminarView(APIView):
 
@@ -93,6 +121,19 @@ class UserSeminarView(APIView):
         return Response(status=status_code, data=data)
 
 
+class BulkUserSeminarView(APIView):
+
+    def post(self, request, seminar_id=None):
+
+        service = BulkRegisterSeminarService(
+            data=request.data,
+            context={'request': request, 'seminar_id': seminar_id}
+        )
+        status_code, data = service.execute()
+
+        return Response(status=status_code, data=data)
+
+
 @api_view(['GET'])
 def query_practice(request):
 
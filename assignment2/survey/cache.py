@@ -0,0 +1,39 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.http import quote_etag
+
+from common.db_router import use_primary
+
+# top_50 페이지(index.html)는 새 설문이 들어오기 전까지 내용이 바뀌지 않으므로 렌더링 결과를 통째로 캐시합니다.
+# 설문이나 운영체제가 저장되면 survey/signals.py 에서, bulk_create 로 넣는 download_survey 에서는 직접 지웁니다.
+# 지운 뒤 복제 DB 에서 예전 설문을 읽어 다시 캐시하지 않도록 primary 에서 읽습니다.
+
+TOP_50_CACHE_KEY = 'survey:top_50'
+
+
+def get_top_50_page(request):
+    # {'content', 'etag', 'last_modified'} 를 돌려줍니다. 캐시에 없을 때만 한 번의 쿼리로 설문을 읽어 렌더링합니다.
+    from survey.models import SurveyResult
+
+    page = cache.get(TOP_50_CACHE_KEY)
+    if page is None:
+        with use_primary():
+            surveys = list(SurveyResult.objects.select_related('os').order_by('-timestamp', '-id')[:50])
+        content = render_to_string('index.html', context={'surveys': surveys}, request=request)
+        page = {
+            'content': content,
+            'etag': quote_etag(hashlib.md5(content.encode('utf-8')).hexdigest()),
+            'last_modified': int(time.time()),
+        }
+        cache.set(TOP_50_CACHE_KEY, page, timeout=None)
+    return page
+
+
+def invalidate_top_50():
+    cache.delete(TOP_50_CACHE_KEY)
+    # 커밋 전에 다른 요청이 예전 내용을 다시 캐시했을 수 있으므로, 커밋 후 한 번 더 지웁니다.
+    transaction.on_commit(lambda: cache.delete(TOP_50_CACHE_KEY))
@@ -1,44 +1,117 @@
-from pathlib import Path
+import hashlib
+from collections import defaultdict
+from itertools import islice
 
 from datetime import datetime
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 
 from waffle_backend import settings
+from survey.cache import invalidate_top_50
 from survey.models import OperatingSystem, SurveyResult
+from survey.statistics import add_to_statistics
 
 
-def download_survey(user=None):
-    # NOTE: if you run this command multiple times, rows of 'survey_surveyresult' table will be added repeatedly.
-    #       to block that behavior, uncomment below lines.
-    #
-    # if SurveyResult.objects.all().exists():
-    #     raise Exception("There already exists data. Perhaps you are downloading it multiple times")
+def row_hash_of(line):
+    return hashlib.sha256(line.encode('utf-8')).hexdigest()
 
-    path = settings.BASE_DIR
-    if not path:
-        raise Exception("Please specify path of directory including 'example_surveyresult.tsv'!")
-    tsv_file = f"{path}/example_surveyresult.tsv"
+
+def survey_of(line, row_hash, os_ids):
+    data = line.split('\t')
+    return SurveyResult(timestamp=timezone.make_aware(datetime.strptime(data[0], '%Y-%m-%d %H:%M:%S')),
+                        os_id=os_ids[data[1]] if data[1] else None, python=int(data[2]), rdb=int(data[3]),
+                        programming=int(data[4]), major=data[5], grade=data[6],
+                        backend_reason=data[7], waffle_reason=data[8], say_something=data[9],
+                        row_hash=row_hash)
+
+
+# row_hash 가 생기기 전에 가져온 설문은 원본 라인을 알 수 없으므로(timestamp 도 가져온 시각으로 저장되었습니다.)
+# timestamp 를 뺀 나머지 열이 같은 설문끼리 짝을 지어 확인합니다. 예전 명령은 마지막 열의 줄바꿈까지 say_something 에 넣었습니다.
+CONTENT_FIELDS = ('os__name', 'python', 'rdb', 'programming', 'major', 'grade',
+                  'backend_reason', 'waffle_reason', 'say_something')
+
+
+def content_key(values):
+    os_name, python, rdb, programming, *texts, say_something = values
+    return (os_name or '', int(python), int(rdb), int(programming), *texts, say_something.rstrip('\r\n'))
+
+
+def legacy_surveys():
+    # 내용 -> row_hash 가 없는 설문 id 목록. 같은 내용의 응답이 여러 개일 수 있으므로 목록으로 둡니다.
+    legacy = defaultdict(list)
+    for survey_id, *values in SurveyResult.objects.filter(row_hash__isnull=True).order_by('id').values_list(
+        'id', *CONTENT_FIELDS
+    ).iterator():
+        legacy[content_key(values)].append(survey_id)
+    return legacy
+
+
+def download_survey(user=None, tsv_file=None, batch_size=1000):
+    # NOTE: 각 행은 원본 라인의 해시(row_hash)로 구분되므로, 여러 번 실행해도 이미 가져온 행은 건너뜁니다.
+    #       파일은 batch_size 줄씩 읽어 배치마다 한 번의 bulk_create 와 트랜잭션으로 넣습니다.
+
+    if not tsv_file:
+        path = settings.BASE_DIR
+        if not path:
+            raise Exception("Please specify path of directory including 'example_surveyresult.tsv'!")
+        tsv_file = f"{path}/example_surveyresult.tsv"
 
     OperatingSystem.objects.get_or_create(name='Windows', price=200000, description="Most favorite OS in South Korea")
     OperatingSystem.objects.get_or_create(name='MacOS', price=300000, description="Most favorite OS of Seminar Instructors")
     OperatingSystem.objects.get_or_create(name='Ubuntu (Linux)', price=0, description="Linus Benedict Torvalds")
 
+    # 운영체제는 몇 개 되지 않으므로 name -> id 를 메모리에 들고 있습니다.
+    os_ids = dict(OperatingSystem.objects.values_list('name', 'id'))
+    legacy = legacy_surveys()
+    created = skipped = 0
+
     with open(tsv_file) as f:
-        for idx, line in enumerate(f, start=1):
-            if idx < 2:
-                continue
+        next(f, None)  # header
+        lines = (line.rstrip('\r\n') for line in f)
+        while batch := list(islice(lines, batch_size)):
+            # 같은 배치 안에 똑같은 라인이 있으면 하나만 남깁니다.
+            batch = list(dict.fromkeys(line for line in batch if line))
 
-            data = line.split('\t')
+            # 운영체제가 빈 칸이면(export_survey 로 내보낸 운영체제 없는 설문) os 없이 넣습니다.
+            for name in {line.split('\t')[1] for line in batch} - os_ids.keys() - {''}:
+                os_ids[name] = OperatingSystem.objects.get_or_create(name=name)[0].id
 
-            operating_system, created = OperatingSystem.objects.get_or_create(name=data[1])
-            t = SurveyResult.objects.create(timestamp=timezone.make_aware(datetime.strptime(data[0], '%Y-%m-%d %H:%M:%S')),
-                                        os=operating_system, python=int(data[2]), rdb=int(data[3]),
-                                        programming=int(data[4]), major=data[5], grade=data[6],
-                                        backend_reason=data[7], waffle_reason=data[8], say_something=data[9], )
+            with transaction.atomic():
+                hashes = {row_hash_of(line): line for line in batch}
+                existing = set(SurveyResult.objects.filter(row_hash__in=hashes).values_list('row_hash', flat=True))
+                surveys, adopted = [], []
+                for row_hash, line in hashes.items():
+                    if row_hash in existing:
+                        continue
+                    survey = survey_of(line, row_hash, os_ids)
+                    # row_hash 없이 가져와 둔 같은 내용의 설문이 있으면 새로 넣지 않고 그 설문에 row_hash 를 채웁니다.
+                    ids = legacy.get(content_key(line.split('\t')[1:]))
+                    if ids:
+                        survey.id = ids.pop(0)
+                        adopted.append(survey)
+                    else:
+                        surveys.append(survey)
+                SurveyResult.objects.bulk_update(adopted, ['row_hash', 'say_something'])
+                # 같은 파일을 동시에 가져오는 경우에는 ignore_conflicts 로 넘기지 않고 실패시켜, 통계가 어긋나지 않게 합니다.
+                SurveyResult.objects.bulk_create(surveys)
+                add_to_statistics(surveys)
+
+            created += len(surveys)
+            skipped += len(batch) - len(surveys)
+
+    # bulk_create 는 post_save 시그널을 보내지 않으므로 top_50 페이지 캐시를 직접 지웁니다.
+    if created:
+        invalidate_top_50()
+    return created, skipped
 
 
 class Command(BaseCommand):
 
+    def add_arguments(self, parser):
+        parser.add_argument('--path', dest='tsv_file', help='TSV 파일 경로 (기본값: BASE_DIR/example_surveyresult.tsv)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='한 번의 bulk_create 로 넣을 행 수')
+
     def handle(self, *args, **options):
-        download_survey()
+        created, skipped = download_survey(tsv_file=options['tsv_file'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'imported {created} survey(s), skipped {skipped} already imported'))
@@ -0,0 +1,149 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from survey.models import SurveyResult
+
+# download_survey 가 읽는 TSV 와 같은 열 순서입니다. (id, user_id 는 NDJSON 에만 넣습니다.)
+TSV_FIELDS = ('timestamp', 'os__name', 'python', 'rdb', 'programming', 'major', 'grade',
+              'backend_reason', 'waffle_reason', 'say_something')
+EXPORT_FIELDS = ('id', 'user_id') + TSV_FIELDS
+TSV_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# TSV 에서는 값 안의 탭/줄바꿈이 열과 행을 깨뜨리므로 공백으로 바꿉니다. (NDJSON 은 그대로 씁니다.)
+# 운영체제가 없는 설문은 빈 칸으로 쓰고, download_survey 는 빈 칸을 os 없음으로 읽습니다.
+TSV_ESCAPE = str.maketrans({'\t': ' ', '\r': ' ', '\n': ' '})
+
+
+def survey_rows(queryset, after_id=0, chunk_size=2000):
+    # 설문을 id 순으로 chunk_size 개씩 (id > 마지막 id) 조건으로 끊어 읽습니다.
+    # mysqlclient 는 .iterator() 로 읽어도 결과 전체를 메모리에 받아두므로, 한 번에 읽는 양을 쿼리로 제한해야 메모리가 일정합니다.
+    # os__name 은 LEFT JOIN 으로 같은 쿼리에서 가져옵니다.
+    while True:
+        chunk = queryset.filter(id__gt=after_id).order_by('id').values_list(*EXPORT_FIELDS)[:chunk_size]
+        count = 0
+        for row in chunk.iterator(chunk_size=chunk_size):
+            count += 1
+            after_id = row[0]
+            yield row
+        if count < chunk_size:
+            return
+
+
+def tsv_line(row):
+    timestamp, os_name, *values = row[2:]
+    values = [timezone.localtime(timestamp).strftime(TSV_TIMESTAMP_FORMAT), os_name or '', *values]
+    return '\t'.join(str(value).translate(TSV_ESCAPE) for value in values) + '\n'
+
+
+def ndjson_line(row):
+    survey = dict(zip(EXPORT_FIELDS, row))
+    survey['timestamp'] = survey['timestamp'].isoformat()
+    survey['os'] = survey.pop('os__name')
+    return json.dumps(survey, ensure_ascii=False) + '\n'
+
+
+def export_survey(out, fmt='tsv', after_id=0, start=None, end=None, chunk_size=2000):
+    # [start, end) 시간 범위에서 id 가 after_id 보다 큰 설문을 out 에 쓰고, (쓴 설문 수, 마지막 id) 를 돌려줍니다.
+    # 마지막 id 를 다음 실행의 after_id 로 넘기면 그 사이 새로 들어온 설문만 내보냅니다.
+    queryset = SurveyResult.objects.all()
+    if start is not None:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end is not None:
+        queryset = queryset.filter(timestamp__lt=end)
+
+    if fmt == 'tsv':
+        out.write('\t'.join(TSV_FIELDS) + '\n')  # header (download_survey 는 첫 줄을 건너뜁니다.)
+    line_of = tsv_line if fmt == 'tsv' else ndjson_line
+
+    exported, last_id = 0, after_id
+    for row in survey_rows(queryset, after_id, chunk_size):
+        out.write(line_of(row))
+        exported, last_id = exported + 1, row[0]
+    return exported, last_id
+
+
+def parse_moment(value):
+    # '2021-08-26' 또는 '2021-08-26 21:25:32' 형식을 받아 현재 시간대의 aware datetime 으로 바꿉니다.
+    moment = parse_datetime(value)
+    if moment is None and (day := parse_date(value)) is not None:
+        moment = datetime.combine(day, time.min)
+    if moment is None:
+        raise CommandError(f'날짜/시각 형식이 아닙니다: {value}')
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment)
+
+
+def default_file_mode():
+    # open() 으로 새로 만든 파일과 같은 권한입니다. (umask 는 바꿔봐야만 읽을 수 있습니다.)
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_atomically(path, write, compress=False):
+    # 다 쓴 뒤에 파일을 바꿔치기해서, 중간에 실패해도 반쯤 쓴 파일이 남지 않게 합니다.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.export_survey-')
+    os.close(fd)
+    try:
+        with (gzip.open if compress else open)(tmp_path, 'wt', encoding='utf-8') as f:
+            result = write(f)
+        # mkstemp 는 0600 으로 만들고 os.replace 는 그 권한을 그대로 가져가므로 보통 파일 권한으로 바꿉니다.
+        os.chmod(tmp_path, default_file_mode())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return result
+
+
+class Command(BaseCommand):
+
+    help = ('설문 결과를 download_survey 와 같은 TSV(또는 NDJSON)로 내보냅니다. '
+            '설문을 id 순으로 나눠 읽으므로 설문 수와 관계없이 메모리를 일정하게 씁니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='내보낼 파일 경로 (기본값: 표준 출력). .gz 로 끝나면 gzip 으로 압축합니다.')
+        parser.add_argument('--format', choices=('tsv', 'ndjson'), default='tsv', help='내보낼 형식')
+        parser.add_argument('--gzip', action='store_true', help='--output 파일을 gzip 으로 압축합니다.')
+        parser.add_argument('--since', help='이 시각 이후(포함)의 설문만 내보냅니다. (예: 2021-08-26 또는 "2021-08-26 21:00:00")')
+        parser.add_argument('--until', help='이 시각 이전(미포함)의 설문만 내보냅니다.')
+        parser.add_argument('--after-id', type=int, default=0, help='id 가 이 값보다 큰 설문만 내보냅니다.')
+        parser.add_argument('--state-file',
+                            help='마지막으로 내보낸 id 를 기록하는 파일. 있으면 그 id 다음부터 내보내고, 성공하면 새 id 로 바꿉니다.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='한 번의 쿼리로 읽을 설문 수')
+
+    def handle(self, *args, **options):
+        after_id = options['after_id']
+        state_file = options['state_file']
+        if state_file and os.path.exists(state_file):
+            with open(state_file) as f:
+                after_id = max(after_id, int(f.read().strip() or 0))
+
+        output = options['output']
+        compress = options['gzip'] or bool(output and output.endswith('.gz'))
+        if compress and not output:
+            raise CommandError('압축해서 내보내려면 --output 을 지정하세요.')
+
+        start = parse_moment(options['since']) if options['since'] else None
+        end = parse_moment(options['until']) if options['until'] else None
+
+        def write(out):
+            return export_survey(out, fmt=options['format'], after_id=after_id, start=start, end=end,
+                                 chunk_size=options['chunk_size'])
+
+        if output:
+            exported, last_id = write_atomically(output, write, compress=compress)
+        else:
+            exported, last_id = write(self.stdout)
+
+        # NOTE: 내보내는 동안 아직 커밋되지 않은 트랜잭션이 더 작은 id 를 받아두었다면, 그 설문은 다음 실행에서 빠집니다.
+        #       --state-file 로 이어 내보낼 때는 download_survey 로 가져오는 중이 아닐 때 실행합니다.
+        if state_file:
+            write_atomically(state_file, lambda f: f.write(f'{last_id}\n'))
+        self.stderr.write(self.style.SUCCESS(f'exported {exported} survey(s), last id {last_id}'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from survey.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+
+    help = ('설문 전문 검색 색인과 트리거를 survey_surveyresult 전체로부터 다시 만듭니다. '
+            '(download_survey 로 넣은 행도 트리거로 색인되지만, 색인이 어긋났거나 테이블을 다시 만든 뒤에 씁니다.)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--optimize', action='store_true', help='다시 만든 뒤 색인 세그먼트를 하나로 합칩니다.')
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index(connection, optimize=options['optimize'])
+        self.stdout.write(self.style.SUCCESS(f'indexed {indexed} survey(s)'))
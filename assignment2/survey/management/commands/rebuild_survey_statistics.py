@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from survey.models import SurveyStatistic
+from survey.statistics import rebuild_statistics
+
+
+class Command(BaseCommand):
+
+    help = '설문 통계(SurveyStatistic)를 SurveyResult 전체로부터 다시 계산합니다.'
+
+    def handle(self, *args, **options):
+        rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS(f'rebuilt {SurveyStatistic.objects.count()} survey statistic group(s)'))
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.6 on 2026-10-17 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0002_auto_20210910_1509'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyresult',
+            name='row_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.6 on 2026-10-17 06:08
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_statistics(apps, schema_editor):
+    # 이미 있는 설문으로 통계를 채워, 마이그레이션 직후부터 /survey/statistics/ 가 맞게 나오게 합니다.
+    # (survey/statistics.py 의 rebuild_statistics 와 같은 계산을 이 시점의 모델로 합니다.)
+    SurveyResult = apps.get_model('survey', 'SurveyResult')
+    SurveyStatistic = apps.get_model('survey', 'SurveyStatistic')
+    db = schema_editor.connection.alias
+
+    histogram = {
+        f'{field}_{score}': Count('id', filter=Q(**{field: score}))
+        for field in ('python', 'rdb', 'programming') for score in range(1, 6)
+    }
+    for dimension, column in (('os', Coalesce('os__name', Value(''))), ('major', F('major')), ('grade', F('grade'))):
+        rows = SurveyResult.objects.using(db).values(group=column).annotate(count=Count('id'), **histogram).order_by()
+        SurveyStatistic.objects.using(db).bulk_create(
+            SurveyStatistic(dimension=dimension, value=row.pop('group'), **row) for row in rows
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0003_surveyresult_row_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyStatistic',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('python_1', models.PositiveIntegerField(default=0)),
+                ('python_2', models.PositiveIntegerField(default=0)),
+                ('python_3', models.PositiveIntegerField(default=0)),
+                ('python_4', models.PositiveIntegerField(default=0)),
+                ('python_5', models.PositiveIntegerField(default=0)),
+                ('rdb_1', models.PositiveIntegerField(default=0)),
+                ('rdb_2', models.PositiveIntegerField(default=0)),
+                ('rdb_3', models.PositiveIntegerField(default=0)),
+                ('rdb_4', models.PositiveIntegerField(default=0)),
+                ('rdb_5', models.PositiveIntegerField(default=0)),
+                ('programming_1', models.PositiveIntegerField(default=0)),
+                ('programming_2', models.PositiveIntegerField(default=0)),
+                ('programming_3', models.PositiveIntegerField(default=0)),
+                ('programming_4', models.PositiveIntegerField(default=0)),
+                ('programming_5', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='surveystatistic',
+            constraint=models.UniqueConstraint(fields=('dimension', 'value'), name='unique_survey_statistic'),
+        ),
+        migrations.RunPython(fill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# 전문 검색 색인(FTS5)과 트리거는 sqlite 에서만 만듭니다. (survey/search.py 참고)
+# 나중에 모델이나 survey/search.py 가 바뀌어도 이 마이그레이션이 하는 일은 그대로여야 하므로, 이 시점의 SQL 을 그대로 적어둡니다.
+
+CREATE_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS survey_surveyresult_search USING fts5(
+        backend_reason, waffle_reason, say_something, content='survey_surveyresult', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS survey_surveyresult_search_insert AFTER INSERT ON survey_surveyresult BEGIN
+        INSERT INTO survey_surveyresult_search(rowid, backend_reason, waffle_reason, say_something)
+        VALUES (new.id, new.backend_reason, new.waffle_reason, new.say_something);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS survey_surveyresult_search_delete AFTER DELETE ON survey_surveyresult BEGIN
+        INSERT INTO survey_surveyresult_search(survey_surveyresult_search, rowid, backend_reason, waffle_reason, say_something)
+        VALUES ('delete', old.id, old.backend_reason, old.waffle_reason, old.say_something);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS survey_surveyresult_search_update
+    AFTER UPDATE OF backend_reason, waffle_reason, say_something ON survey_surveyresult BEGIN
+        INSERT INTO survey_surveyresult_search(survey_surveyresult_search, rowid, backend_reason, waffle_reason, say_something)
+        VALUES ('delete', old.id, old.backend_reason, old.waffle_reason, old.say_something);
+        INSERT INTO survey_surveyresult_search(rowid, backend_reason, waffle_reason, say_something)
+        VALUES (new.id, new.backend_reason, new.waffle_reason, new.say_something);
+    END""",
+    "INSERT INTO survey_surveyresult_search(survey_surveyresult_search) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS survey_surveyresult_search_insert',
+    'DROP TRIGGER IF EXISTS survey_surveyresult_search_delete',
+    'DROP TRIGGER IF EXISTS survey_surveyresult_search_update',
+    'DROP TABLE IF EXISTS survey_surveyresult_search',
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for sql in statements:
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0004_surveystatistic'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -27,4 +27,38 @@ class SurveyResult(models.Model):
     waffle_reason = models.CharField(max_length=500, blank=True)
     say_something = models.CharField(max_length=500, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
-    user = models.ForeignKey(get_user_model(), null=True, on_delete=models.DO_NOTHING)
\ No newline at end of file
+    user = models.ForeignKey(get_user_model(), null=True, on_delete=models.DO_NOTHING)
+    # download_survey 로 가져온 행의 원본 TSV 라인 해시. 같은 파일을 여러 번 가져와도 중복으로 쌓이지 않게 합니다.
+    row_hash = models.CharField(max_length=64, null=True, unique=True, editable=False)
+
+
+class SurveyStatistic(models.Model):
+
+    # 운영체제/전공/학년별 설문 수와 python, rdb, programming 응답(1~5)의 히스토그램을 미리 모아둔 테이블.
+    # 설문이 추가될 때마다 F() 로 증가시키며(survey/statistics.py), 통계 API 는 이 테이블만 읽습니다.
+    DIMENSIONS = ('os', 'major', 'grade')
+    FIELDS = ('python', 'rdb', 'programming')
+
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+    python_1 = models.PositiveIntegerField(default=0)
+    python_2 = models.PositiveIntegerField(default=0)
+    python_3 = models.PositiveIntegerField(default=0)
+    python_4 = models.PositiveIntegerField(default=0)
+    python_5 = models.PositiveIntegerField(default=0)
+    rdb_1 = models.PositiveIntegerField(default=0)
+    rdb_2 = models.PositiveIntegerField(default=0)
+    rdb_3 = models.PositiveIntegerField(default=0)
+    rdb_4 = models.PositiveIntegerField(default=0)
+    rdb_5 = models.PositiveIntegerField(default=0)
+    programming_1 = models.PositiveIntegerField(default=0)
+    programming_2 = models.PositiveIntegerField(default=0)
+    programming_3 = models.PositiveIntegerField(default=0)
+    programming_4 = models.PositiveIntegerField(default=0)
+    programming_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value'], name='unique_survey_statistic'),
+        ]
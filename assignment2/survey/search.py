@@ -0,0 +1,118 @@
+import html
+
+from django.db import NotSupportedError, connections, router
+
+from survey.models import SurveyResult
+
+# 설문 자유 응답(backend_reason, waffle_reason, say_something) 전문 검색.
+# sqlite 의 FTS5 역색인(SEARCH_TABLE)을 survey_surveyresult 를 내용으로 하는 external content 테이블로 두고,
+# 트리거로 INSERT/UPDATE/DELETE 를 따라가게 합니다. 시그널과 달리 bulk_create(download_survey)로 넣은 행도 바로 색인됩니다.
+# sqlite 가 테이블을 다시 만드는 마이그레이션(AlterField 등) 뒤에는 트리거가 사라지므로
+# python manage.py rebuild_survey_search 로 트리거와 색인을 다시 만듭니다.
+
+SEARCH_TABLE = 'survey_surveyresult_search'
+SEARCH_FIELDS = ('backend_reason', 'waffle_reason', 'say_something')
+MAX_TERMS = 10
+SNIPPET_TOKENS = 16
+# 응답에서는 본문을 HTML 이스케이프한 뒤 <mark> 로 바꿉니다. (본문에 있을 수 없는 제어 문자)
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+
+
+def _columns(prefix=''):
+    return ', '.join(f'{prefix}{field}' for field in SEARCH_FIELDS)
+
+
+def search_index_sql():
+    table, content = SEARCH_TABLE, SurveyResult._meta.db_table
+    # 한국어는 조사가 붙으므로 단어 단위(unicode61)로 색인하고 접두어로 찾습니다. 짧은 접두어는 따로 색인해둡니다.
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+            {_columns()}, content='{content}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON {content} BEGIN
+            INSERT INTO {table}(rowid, {_columns()}) VALUES (new.id, {_columns('new.')});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON {content} BEGIN
+            INSERT INTO {table}({table}, rowid, {_columns()}) VALUES ('delete', old.id, {_columns('old.')});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_update AFTER UPDATE OF {_columns()} ON {content} BEGIN
+            INSERT INTO {table}({table}, rowid, {_columns()}) VALUES ('delete', old.id, {_columns('old.')});
+            INSERT INTO {table}(rowid, {_columns()}) VALUES (new.id, {_columns('new.')});
+        END""",
+    ]
+
+
+def check_supported(connection):
+    if connection.vendor != 'sqlite':
+        raise NotSupportedError(f'설문 검색은 sqlite(FTS5)에서만 지원합니다. ({connection.vendor})')
+
+
+def create_search_index(connection):
+    # 이미 있으면 그대로 두므로 여러 번 불러도 됩니다.
+    check_supported(connection)
+    with connection.cursor() as cursor:
+        for sql in search_index_sql():
+            cursor.execute(sql)
+
+
+def drop_search_index(connection):
+    check_supported(connection)
+    with connection.cursor() as cursor:
+        for suffix in ('insert', 'delete', 'update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}')
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def rebuild_search_index(connection, optimize=False):
+    # 색인을 survey_surveyresult 전체로부터 다시 만들고, 색인된 설문 수를 돌려줍니다.
+    create_search_index(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+        if optimize:
+            # 조각난 색인(b-tree 세그먼트)을 하나로 합쳐 검색을 빠르게 합니다.
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}_docsize')
+        return cursor.fetchone()[0]
+
+
+def match_query(text):
+    # 입력한 단어마다 접두어로 찾고("재밌" 이 '재밌어서' 에도 맞도록), 모든 단어가 들어있는 응답만 찾습니다.
+    # 따옴표로 감싸 FTS5 문법(AND, NEAR, * 등)으로 해석되지 않게 합니다. 검색할 단어가 없으면 None 을 돌려줍니다.
+    terms = text.split()[:MAX_TERMS]
+    if not terms:
+        return None
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def highlight(snippet):
+    return html.escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+
+def search_surveys(text, limit, offset=0):
+    # bm25 점수 순으로 [offset, offset + limit) 번째 설문을 {'id', 'score', 'snippets'} 로 돌려줍니다.
+    # snippets 에는 검색어가 들어있는 필드만, 검색어 주변 SNIPPET_TOKENS 단어를 담습니다.
+    if (query := match_query(text)) is None:
+        return []
+
+    connection = connections[router.db_for_read(SurveyResult)]
+    check_supported(connection)
+    snippets = ', '.join(
+        f"snippet({SEARCH_TABLE}, {i}, char(2), char(3), '…', {SNIPPET_TOKENS})" for i in range(len(SEARCH_FIELDS))
+    )
+    with connection.cursor() as cursor:
+        # FTS5 의 rank(bm25) 는 작을수록 잘 맞으므로 부호를 바꿔 점수로 씁니다.
+        cursor.execute(
+            f'SELECT rowid, -rank, {snippets} FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY rank LIMIT %s OFFSET %s',
+            [query, limit, offset],
+        )
+        rows = cursor.fetchall()
+
+    return [{
+        'id': survey_id,
+        'score': round(score, 6),
+        'snippets': {
+            field: highlight(snippet) for field, snippet in zip(SEARCH_FIELDS, snippets) if HIGHLIGHT_START in snippet
+        },
+    } for survey_id, score, *snippets in rows]
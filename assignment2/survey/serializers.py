@@ -1,6 +1,8 @@
+from django.db import transaction
 from rest_framework import serializers
 
 from survey.models import OperatingSystem, SurveyResult
+from survey.statistics import add_to_statistics
 from user.serializers import UserSerializer
 
 
@@ -28,6 +30,13 @@ class SurveyResultSerializer(serializers.ModelSerializer):
             'os_name'
         )
 
+    @staticmethod
+    def etag_fields():
+        # 상세 응답을 결정하는 값들입니다. (common/conditional.py 참고) 설문과 운영체제에는 updated_at 이 없어 값을 그대로 봅니다.
+        fields, aggregates = UserSerializer.etag_fields(prefix='user__')
+        return ('id', 'python', 'rdb', 'programming', 'major', 'grade', 'backend_reason', 'waffle_reason',
+                'say_something', 'timestamp', 'os__id', 'os__name', 'os__description', 'os__price') + fields, aggregates
+
     def get_os(self, survey):
         return OperatingSystemSerializer(survey.os, context=self.context).data
 
@@ -36,11 +45,14 @@ class SurveyResultSerializer(serializers.ModelSerializer):
             return UserSerializer(survey.user, context=self.context).data
         return None
 
+    @transaction.atomic
     def create(self, validated_data):
         os, created = OperatingSystem.objects.get_or_create(name=validated_data.pop('os_name'))
         validated_data['os'] = os
         validated_data['user'] = self.context['request'].user
-        return super().create(validated_data)
+        survey = super().create(validated_data)
+        add_to_statistics([survey])
+        return survey
 
 
 class OperatingSystemSerializer(serializers.ModelSerializer):
@@ -52,4 +64,12 @@ class OperatingSystemSerializer(serializers.ModelSerializer):
             'name',
             'description',
             'price',
-        )
\ No newline at end of file
+        )
+
+
+class SurveySearchSerializer(serializers.Serializer):
+
+    # GET /api/v1/survey/search/ 의 쿼리 파라미터
+    q = serializers.CharField(max_length=200)
+    offset = serializers.IntegerField(min_value=0, default=0)
+    page_size = serializers.IntegerField(min_value=1, required=False)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from survey.cache import invalidate_top_50
+from survey.models import OperatingSystem, SurveyResult
+
+
+@receiver(post_save, sender=SurveyResult)
+@receiver(post_delete, sender=SurveyResult)
+@receiver(post_save, sender=OperatingSystem)
+@receiver(post_delete, sender=OperatingSystem)
+def invalidate_top_50_on_change(sender, instance, **kwargs):
+    invalidate_top_50()
@@ -0,0 +1,77 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
+
+from survey.models import OperatingSystem, SurveyResult, SurveyStatistic
+
+SCORES = range(1, 6)
+
+
+def group_keys(survey, os_names):
+    return (
+        ('os', os_names.get(survey.os_id, '')),
+        ('major', survey.major),
+        ('grade', survey.grade),
+    )
+
+
+def add_to_statistics(surveys):
+    # 새로 저장된 설문들을 (dimension, value) 별로 모아, 그룹마다 한 번의 UPDATE ... SET x = x + n 으로 반영합니다.
+    # 설문을 저장하는 트랜잭션 안에서 호출해야 설문과 통계가 함께 커밋/롤백됩니다.
+    os_names = dict(OperatingSystem.objects.filter(
+        id__in={survey.os_id for survey in surveys}
+    ).values_list('id', 'name'))
+
+    deltas = defaultdict(Counter)
+    for survey in surveys:
+        for key in group_keys(survey, os_names):
+            delta = deltas[key]
+            delta['count'] += 1
+            for field in SurveyStatistic.FIELDS:
+                delta[f'{field}_{getattr(survey, field)}'] += 1
+
+    SurveyStatistic.objects.bulk_create(
+        [SurveyStatistic(dimension=dimension, value=value) for dimension, value in deltas],
+        ignore_conflicts=True
+    )
+    for (dimension, value), delta in deltas.items():
+        SurveyStatistic.objects.filter(dimension=dimension, value=value).update(
+            **{field: F(field) + n for field, n in delta.items()}
+        )
+
+
+@transaction.atomic
+def rebuild_statistics():
+    # 통계 테이블을 비우고, 차원마다 GROUP BY 쿼리 한 번으로 다시 계산합니다.
+    SurveyStatistic.objects.all().delete()
+
+    histogram = {
+        f'{field}_{score}': Count('id', filter=Q(**{field: score}))
+        for field in SurveyStatistic.FIELDS for score in SCORES
+    }
+    for dimension, column in (('os', Coalesce('os__name', Value(''))), ('major', F('major')), ('grade', F('grade'))):
+        rows = SurveyResult.objects.values(group=column).annotate(count=Count('id'), **histogram).order_by()
+        SurveyStatistic.objects.bulk_create(
+            SurveyStatistic(dimension=dimension, value=row.pop('group'), **row) for row in rows
+        )
+
+
+def statistics_of(statistic):
+    data = {'value': statistic.value, 'count': statistic.count}
+    for field in SurveyStatistic.FIELDS:
+        histogram = [getattr(statistic, f'{field}_{score}') for score in SCORES]
+        total = sum(histogram)
+        data[field] = {
+            'mean': round(sum(score * n for score, n in zip(SCORES, histogram)) / total, 4) if total else None,
+            'histogram': histogram,
+        }
+    return data
+
+
+def survey_statistics():
+    data = {dimension: [] for dimension in SurveyStatistic.DIMENSIONS}
+    for statistic in SurveyStatistic.objects.order_by('dimension', '-count', 'value'):
+        data[statistic.dimension].append(statistics_of(statistic))
+    return data
@@ -1,12 +1,29 @@
-from django.db.models import F
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Avg, F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 
 # Create your tests here.
 from rest_framework import status
 
-from seminar.models import User
+from seminar.models import Seminar, User, UserSeminar
 from survey.models import OperatingSystem, SurveyResult
+from survey.search import SEARCH_TABLE, search_surveys
+from survey.serializers import SurveyResultSerializer
+from survey.views import SurveyResultViewSet
+from user.test_user import UserFactory
 
 
 class TestExample(TestCase):
@@ -39,3 +56,458 @@ class TestExample(TestCase):
         response = client.get('/api/v1/user/me/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+
+class SurveyResultListTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        os = OperatingSystem.objects.create(name='os')
+        SurveyResult.objects.bulk_create(
+            SurveyResult(os=os, python=1, rdb=2, programming=3, major='major', grade='1학년', backend_reason='')
+            for _ in range(25)
+        )
+
+    def test_list_커서_페이지네이션(self):
+        seen, url = [], '/api/v1/survey/?page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 10)
+            seen += [survey['id'] for survey in response.data['results']]
+            url = response.data['next']
+
+        # bulk_create 로 timestamp 가 같은 행이 많아도, id 로 순서가 정해져 빠지거나 겹치는 행이 없습니다.
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_list_기본_페이지_크기(self):
+        response = self.client.get('/api/v1/survey/')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+
+class DownloadSurveyTest(TestCase):
+
+    def test_download_survey_재실행(self):
+        out = StringIO()
+        call_command('download_survey', '--batch-size', '10', stdout=out)
+        self.assertIn('imported 67 survey(s), skipped 0', out.getvalue())
+        self.assertEqual(SurveyResult.objects.count(), 67)
+        self.assertEqual(OperatingSystem.objects.count(), 3)
+
+        survey = SurveyResult.objects.get(major='타 전공', grade='3학년', os__name='MacOS', python=1)
+        self.assertEqual(survey.say_something, '')
+
+        # 다시 실행해도 이미 가져온 행은 건너뜁니다.
+        out = StringIO()
+        call_command('download_survey', stdout=out)
+        self.assertIn('imported 0 survey(s), skipped 67', out.getvalue())
+        self.assertEqual(SurveyResult.objects.count(), 67)
+
+    def test_row_hash_이전에_가져온_설문(self):
+        # row_hash 가 생기기 전의 download_survey 처럼, 마지막 열의 줄바꿈까지 넣고 row_hash 없이 저장해둡니다.
+        with open(settings.BASE_DIR / 'example_surveyresult.tsv') as f:
+            lines = f.readlines()[1:]
+        for line in lines:
+            data = line.split('\t')
+            os = OperatingSystem.objects.get_or_create(name=data[1])[0]
+            SurveyResult.objects.create(os=os, python=int(data[2]), rdb=int(data[3]), programming=int(data[4]),
+                                        major=data[5], grade=data[6], backend_reason=data[7],
+                                        waffle_reason=data[8], say_something=data[9])
+        self.assertEqual(SurveyResult.objects.count(), 67)
+
+        for _ in range(2):
+            out = StringIO()
+            call_command('download_survey', '--batch-size', '10', stdout=out)
+            self.assertIn('imported 0 survey(s), skipped 67', out.getvalue())
+        self.assertEqual(SurveyResult.objects.count(), 67)
+        self.assertFalse(SurveyResult.objects.filter(row_hash__isnull=True).exists())
+        self.assertFalse(SurveyResult.objects.filter(say_something__endswith='\n').exists())
+
+
+class Top50PageTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.oses = [OperatingSystem.objects.create(name=f'os{i}') for i in range(3)]
+        SurveyResult.objects.bulk_create(
+            SurveyResult(os=cls.oses[i % 3], python=1, rdb=2, programming=3, major=f'major{i}', grade='1학년',
+                         backend_reason='')
+            for i in range(60)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_top_50_쿼리_한번(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/survey/top_50/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, '<li>', count=50)
+        self.assertContains(response, 'os2')
+        # 최신순이므로 가장 나중에 넣은 설문이 보이고, 처음 넣은 10개는 빠집니다.
+        self.assertContains(response, 'major59')
+        self.assertNotContains(response, 'major9 ')
+
+        # 두 번째부터는 렌더링된 페이지를 캐시에서 꺼냅니다.
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/v1/survey/top_50/')
+        self.assertEqual(cached.content, response.content)
+
+    def test_top_50_조건부_요청(self):
+        response = self.client.get('/api/v1/survey/top_50/')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = self.client.get('/api/v1/survey/top_50/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        response = self.client.get('/api/v1/survey/top_50/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # 새 설문이 들어오면 캐시가 지워지고, 예전 ETag 로는 304 를 받지 못합니다.
+        SurveyResult.objects.create(os=self.oses[0], python=1, rdb=2, programming=3, major='new major',
+                                    grade='1학년', backend_reason='')
+        response = self.client.get('/api/v1/survey/top_50/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'new major')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_top_50_운영체제_변경(self):
+        self.client.get('/api/v1/survey/top_50/')
+        OperatingSystem.objects.filter(id=self.oses[0].id).update(name='unchanged')
+        self.assertNotContains(self.client.get('/api/v1/survey/top_50/'), 'unchanged')
+
+        os = self.oses[0]
+        os.name = 'renamed'
+        os.save()
+        self.assertContains(self.client.get('/api/v1/survey/top_50/'), 'renamed')
+
+    def test_top_50_download_survey_후_갱신(self):
+        self.client.get('/api/v1/survey/top_50/')
+        call_command('download_survey', stdout=StringIO())
+        self.assertContains(self.client.get('/api/v1/survey/top_50/'), 'MacOS')
+
+
+class SurveyResultRetrieveTest(TestCase):
+
+    def test_retrieve_조건부_요청(self):
+        os = OperatingSystem.objects.create(name='os')
+        user = UserFactory(email='test@test.com', username='test', password='test', is_participant=True)
+        survey = SurveyResult.objects.create(os=os, user=user, python=1, rdb=2, programming=3, major='major',
+                                             grade='1학년', backend_reason='')
+
+        response = self.client.get(f'/api/v1/survey/{survey.id}/')
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/v1/survey/{survey.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # 응답에 들어가는 운영체제나 작성자 정보가 바뀌어도 ETag 가 바뀝니다.
+        OperatingSystem.objects.filter(id=os.id).update(price=1000)
+        response = self.client.get(f'/api/v1/survey/{survey.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['os']['price'], 1000)
+
+        etag = response['ETag']
+        User.objects.filter(id=user.id).update(username='changed')
+        response = self.client.get(f'/api/v1/survey/{survey.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['username'], 'changed')
+
+        self.assertEqual(self.client.get('/api/v1/survey/0/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/v1/survey/abc/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SurveyResultListQueryTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        os = OperatingSystem.objects.create(name='os')
+        seminar = Seminar.objects.create(name='세미나', capacity=100, time=timezone.now().time())
+        for i in range(20):
+            user = UserFactory(email=f'user{i}@test.com', is_participant=True, is_instructor=(i % 2 == 0))
+            UserSeminar.objects.create(user=user, seminar=seminar)
+            SurveyResult.objects.create(
+                os=os, user=user, python=1, rdb=2, programming=3, major='major', grade='1학년', backend_reason=''
+            )
+
+    def test_list_쿼리수_before_after(self):
+        # before: select_related('os') 만 한 경우, 유저마다 유저/프로필/세미나 조회가 따로 나갑니다.
+        with CaptureQueriesContext(connection) as before:
+            SurveyResultSerializer(SurveyResult.objects.select_related('os')[:20], many=True).data
+
+        # after: 설문 목록 + 유저 세미나 prefetch
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get('/api/v1/survey/?page_size=20')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(len(response.data['results'][0]['user']['participant']['seminars']), 1)
+        self.assertGreater(len(before), 20 * 3)
+        self.assertEqual(len(after), 2)
+
+    def test_list_스트리밍(self):
+        response = self.client.get('/api/v1/survey/?page_size=100')
+        expected = response.json()['results']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/survey/?stream=1')
+            body = b''.join(response.streaming_content)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(body), expected)
+        self.assertEqual(len(queries), 2)
+
+        with patch.object(SurveyResultViewSet, 'stream_chunk_size', 7):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/v1/survey/?stream=ndjson')
+                lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(line) for line in lines], expected)
+        # 설문 목록 1번 + chunk(7, 7, 6)마다 유저 세미나 prefetch
+        self.assertEqual(len(queries), 1 + 3)
+
+        # 적어둔 값이 아니면 스트리밍하지 않고 페이지네이션합니다.
+        for value in ('0', 'false', ''):
+            response = self.client.get(f'/api/v1/survey/?stream={value}')
+            self.assertFalse(response.streaming, value)
+            self.assertIn('results', response.json())
+
+
+class SurveyStatisticTest(TestCase):
+
+    def setUp(self):
+        call_command('download_survey', stdout=StringIO())
+        self.user = User.objects.create_user(email='user@user.com', password='password')
+
+    def test_statistics_증분_갱신(self):
+        response = self.client.get('/api/v1/survey/statistics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        macos = next(row for row in response.data['os'] if row['value'] == 'MacOS')
+        surveys = SurveyResult.objects.filter(os__name='MacOS')
+        self.assertEqual(macos['count'], surveys.count())
+        self.assertAlmostEqual(macos['python']['mean'], surveys.aggregate(mean=Avg('python'))['mean'], places=4)
+        self.assertEqual(macos['rdb']['histogram'][0], surveys.filter(rdb=1).count())
+        self.assertEqual(sum(row['count'] for row in response.data['grade']), 67)
+
+        # 그룹 수만큼만 읽습니다.
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/survey/statistics/')
+
+        self.client.force_login(self.user)
+        data = {'os_name': 'Arch', 'python': 5, 'rdb': 4, 'programming': 3, 'major': '컴퓨터공학부 주전공',
+                'grade': '4학년', 'backend_reason': '-'}
+        response = self.client.post('/api/v1/survey/', data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get('/api/v1/survey/statistics/')
+        arch = next(row for row in response.data['os'] if row['value'] == 'Arch')
+        self.assertEqual(arch['count'], 1)
+        self.assertEqual(arch['python'], {'mean': 5.0, 'histogram': [0, 0, 0, 0, 1]})
+
+        # 증분으로 쌓은 통계와 처음부터 다시 계산한 통계가 같아야 합니다.
+        out = StringIO()
+        call_command('rebuild_survey_statistics', stdout=out)
+        self.assertIn('rebuilt', out.getvalue())
+        self.assertEqual(self.client.get('/api/v1/survey/statistics/').data, response.data)
+
+
+class SurveySearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        os = OperatingSystem.objects.create(name='os')
+
+        def survey(backend_reason, waffle_reason='', say_something=''):
+            return SurveyResult.objects.create(os=os, python=1, rdb=1, programming=1, backend_reason=backend_reason,
+                                               waffle_reason=waffle_reason, say_something=say_something)
+
+        cls.django = survey('장고가 재밌어서', '장고 세미나', '장고 최고')
+        cls.spring = survey('스프링을 써봐서', '장고도 배우고 싶어서')
+        cls.other = survey('그냥', '친구가 추천해서', '<script>재밌겠다</script>')
+
+    def search(self, query):
+        response = self.client.get('/api/v1/survey/search/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_점수순_발췌(self):
+        results = self.search('장고')['results']
+        # 여러 필드에 여러 번 나온 설문이 먼저 나옵니다.
+        self.assertEqual([hit['id'] for hit in results], [self.django.id, self.spring.id])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual(results[0]['snippets']['backend_reason'], '<mark>장고가</mark> 재밌어서')
+        # 검색어가 없는 필드는 발췌하지 않습니다.
+        self.assertEqual(set(results[1]['snippets']), {'waffle_reason'})
+
+    def test_접두어_여러_단어(self):
+        self.assertEqual([hit['id'] for hit in self.search('재밌')['results']], [self.django.id, self.other.id])
+        self.assertEqual([hit['id'] for hit in self.search('장고 재밌')['results']], [self.django.id])
+        self.assertEqual(self.search('"장고" OR *')['results'], [])
+
+    def test_발췌는_HTML_이스케이프(self):
+        snippet = self.search('재밌겠다')['results'][0]['snippets']['say_something']
+        self.assertEqual(snippet, '&lt;script&gt;<mark>재밌겠다</mark>&lt;/script&gt;')
+
+    def test_페이지네이션(self):
+        data = self.client.get('/api/v1/survey/search/', {'q': '장고', 'page_size': 1}).data
+        self.assertEqual([hit['id'] for hit in data['results']], [self.django.id])
+        self.assertIsNone(data['previous'])
+
+        data = self.client.get(data['next']).data
+        self.assertEqual([hit['id'] for hit in data['results']], [self.spring.id])
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_검색어_없음(self):
+        response = self.client.get('/api/v1/survey/search/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(search_surveys('   ', limit=10), [])
+
+    def test_쿼리_한번(self):
+        with self.assertNumQueries(1):
+            search_surveys('장고', limit=10)
+
+    def test_수정_삭제_일괄추가_반영(self):
+        SurveyResult.objects.filter(id=self.spring.id).update(waffle_reason='스프링만')
+        self.other.delete()
+        SurveyResult.objects.bulk_create([SurveyResult(python=1, rdb=1, programming=1, backend_reason='장고')])
+
+        hits = search_surveys('장고', limit=10)
+        self.assertEqual(len(hits), 2)
+        self.assertNotIn(self.spring.id, [hit['id'] for hit in hits])
+        self.assertEqual(search_surveys('재밌겠다', limit=10), [])
+
+    def test_download_survey_후_검색(self):
+        call_command('download_survey', stdout=StringIO())
+        hits = search_surveys('재밌', limit=100)
+        self.assertGreater(len(hits), 1)
+        self.assertTrue(all('<mark>재밌' in ''.join(hit['snippets'].values()) for hit in hits))
+
+    def test_rebuild_survey_search(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')")
+        self.assertEqual(search_surveys('장고', limit=10), [])
+
+        out = StringIO()
+        call_command('rebuild_survey_search', '--optimize', stdout=out)
+        self.assertIn('indexed 3 survey(s)', out.getvalue())
+        self.assertEqual(len(search_surveys('장고', limit=10)), 2)
+
+
+class ExportSurveyTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def export(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('export_survey', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def surveys(self):
+        # download_survey 는 timestamp 를 가져온 시각(auto_now_add)으로 넣으므로 나머지 열만 비교합니다.
+        return sorted(SurveyResult.objects.values_list(
+            'os__name', 'python', 'rdb', 'programming', 'major', 'grade', 'backend_reason', 'waffle_reason', 'say_something'
+        ))
+
+    def test_download_survey_로_다시_가져오기(self):
+        macos = OperatingSystem.objects.create(name='MacOS')
+        for python in range(1, 6):
+            SurveyResult.objects.create(os=macos, python=python, rdb=2, programming=3, major='컴퓨터공학부 주전공',
+                                        grade='2학년', backend_reason=f'이유 {python}', say_something='"따옴표"')
+        before = self.surveys()
+
+        _, err = self.export('--output', self.path('surveys.tsv'), '--chunk-size', '2')
+        self.assertIn('exported 5 survey(s)', err)
+
+        SurveyResult.objects.all().delete()
+        out = StringIO()
+        call_command('download_survey', '--path', self.path('surveys.tsv'), stdout=out)
+        self.assertIn('imported 5 survey(s)', out.getvalue())
+        self.assertEqual(self.surveys(), before)
+
+    def test_운영체제_없는_설문_다시_가져오기(self):
+        SurveyResult.objects.create(python=1, rdb=1, programming=1, major='타 전공')
+        self.export('--output', self.path('surveys.tsv'))
+
+        SurveyResult.objects.all().delete()
+        call_command('download_survey', '--path', self.path('surveys.tsv'), stdout=StringIO())
+        survey = SurveyResult.objects.get(major='타 전공')
+        self.assertIsNone(survey.os_id)
+        self.assertFalse(OperatingSystem.objects.filter(name='').exists())
+
+    def test_파일_권한은_umask_를_따름(self):
+        umask = os.umask(0o022)
+        try:
+            self.export('--output', self.path('surveys.tsv'), '--state-file', self.path('export.state'))
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(self.path('surveys.tsv')).st_mode & 0o777, 0o644)
+        self.assertEqual(os.stat(self.path('export.state')).st_mode & 0o777, 0o644)
+
+    def test_chunk_단위로_읽기(self):
+        call_command('download_survey', stdout=StringIO())
+        # 67개를 10개씩: 꽉 찬 6번과 7개짜리 1번
+        with self.assertNumQueries(7):
+            out, _ = self.export('--chunk-size', '10')
+        self.assertEqual(len(out.splitlines()), 1 + 67)
+
+    def test_탭_줄바꿈은_TSV_에서_공백(self):
+        SurveyResult.objects.create(python=1, rdb=1, programming=1, say_something='한 줄\n두\t줄')
+        out, _ = self.export()
+        header, line = out.splitlines()
+        self.assertEqual(header.split('\t')[0], 'timestamp')
+        self.assertEqual(line.split('\t')[1:], ['', '1', '1', '1', '', '', '', '', '한 줄 두 줄'])
+
+    def test_시간_범위_gzip_ndjson(self):
+        os_ = OperatingSystem.objects.create(name='Ubuntu')
+        for day in (25, 26, 27):
+            survey = SurveyResult.objects.create(os=os_, python=day, rdb=1, programming=1, say_something='한 줄\n두 줄')
+            SurveyResult.objects.filter(id=survey.id).update(timestamp=timezone.make_aware(timezone.datetime(2021, 8, day, 12)))
+
+        self.export('--output', self.path('surveys.ndjson.gz'), '--format', 'ndjson',
+                    '--since', '2021-08-26', '--until', '2021-08-27')
+        with gzip.open(self.path('surveys.ndjson.gz'), 'rt', encoding='utf-8') as f:
+            surveys = [json.loads(line) for line in f]
+
+        self.assertEqual(len(surveys), 1)
+        self.assertEqual(surveys[0]['python'], 26)
+        self.assertEqual(surveys[0]['os'], 'Ubuntu')
+        self.assertEqual(surveys[0]['say_something'], '한 줄\n두 줄')
+        self.assertEqual(surveys[0]['timestamp'], '2021-08-26T12:00:00+00:00')
+
+        out, _ = self.export('--since', '2021-08-27')
+        self.assertTrue(out.splitlines()[1].startswith('2021-08-27 12:00:00\tUbuntu\t27\t'))
+
+    def test_state_file_로_이어서_내보내기(self):
+        first = SurveyResult.objects.create(python=1, rdb=1, programming=1)
+        state = self.path('export.state')
+
+        out, err = self.export('--state-file', state)
+        self.assertEqual(len(out.splitlines()), 2)
+        self.assertIn(f'last id {first.id}', err)
+
+        second = SurveyResult.objects.create(python=2, rdb=1, programming=1)
+        out, err = self.export('--state-file', state, '--format', 'ndjson')
+        self.assertEqual([json.loads(line)['id'] for line in out.splitlines()], [second.id])
+        with open(state) as f:
+            self.assertEqual(f.read().strip(), str(second.id))
+
+        # 새 설문이 없으면 아무것도 내보내지 않고 마지막 id 를 그대로 둡니다.
+        out, err = self.export('--state-file', state, '--format', 'ndjson')
+        self.assertEqual(out, '')
+        self.assertIn(f'exported 0 survey(s), last id {second.id}', err)
+
+    def test_after_id(self):
+        first = SurveyResult.objects.create(python=1, rdb=1, programming=1)
+        second = SurveyResult.objects.create(python=2, rdb=1, programming=1)
+        out, _ = self.export('--after-id', str(first.id), '--format', 'ndjson')
+        self.assertEqual([json.loads(line)['id'] for line in out.splitlines()], [second.id])
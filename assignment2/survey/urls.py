@@ -9,5 +9,6 @@ router.register('survey', SurveyResultViewSet, basename='survey')
 router.register('os', OperatingSystemViewSet, basename='os')
 
 urlpatterns = [
+    path('survey/top_50/', top_50, name='top-50'),  # /api/v1/survey/top_50/
     path('', include(router.urls)),
 ]
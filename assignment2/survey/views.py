@@ -1,29 +1,95 @@
-from django.shortcuts import get_object_or_404, render
+from django.conf import settings
+from django.db import NotSupportedError
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.views.decorators.http import require_http_methods
 from rest_framework import status, viewsets, permissions
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
-from survey.serializers import OperatingSystemSerializer, SurveyResultSerializer
+from common.conditional import etag_for, not_modified, object_id
+from common.pagination import TimestampCursorPagination
+from common.streaming import StreamingListMixin
+from seminar.models import UserSeminar
+from survey.cache import get_top_50_page
+from survey.search import search_surveys
+from survey.serializers import OperatingSystemSerializer, SurveyResultSerializer, SurveySearchSerializer
 from survey.models import OperatingSystem, SurveyResult
+from survey.statistics import survey_statistics
 
 
-class SurveyResultViewSet(viewsets.GenericViewSet):
+class SurveyResultViewSet(StreamingListMixin, viewsets.GenericViewSet):
     queryset = SurveyResult.objects.all()
     serializer_class = SurveyResultSerializer
     permission_classes = (permissions.IsAuthenticated(), )
+    pagination_class = TimestampCursorPagination
 
     def get_permissions(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'statistics', 'search'):
             return (permissions.AllowAny(), )
         return self.permission_classes
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # SurveyResultSerializer.get_user 가 행마다 UserSerializer 를 쓰므로, 유저와 프로필은 join 으로,
+            # 유저가 참여한 세미나는 prefetch 한 번으로 미리 가져옵니다. (UserSerializer.user_seminars_of 참고)
+            queryset = queryset.select_related('os', 'user__participant', 'user__instructor').prefetch_related(
+                Prefetch('user__user_seminars', queryset=UserSeminar.objects.select_related('seminar').order_by('id'))
+            )
+        return queryset
+
     def list(self, request):
-        surveys = self.get_queryset().select_related('os')
-        return Response(self.get_serializer(surveys, many=True).data)
+        if self.get_stream_format():
+            return self.stream_list(self.get_queryset(), self.get_serializer_class())
+
+        surveys = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(self.get_serializer(surveys, many=True).data)
 
     def retrieve(self, request, pk=None):
-        survey = get_object_or_404(SurveyResult, pk=pk)
-        return Response(self.get_serializer(survey).data)
+        # 클라이언트가 가진 응답이 그대로라면 작은 쿼리 한 번으로 304 를 돌려줍니다. (common/conditional.py 참고)
+        pk = object_id(pk)
+        etag = etag_for(SurveyResult.objects.filter(pk=pk), *SurveyResultSerializer.etag_fields())
+        if (response := not_modified(request, etag)) is not None:
+            return response
+
+        survey = get_object_or_404(self.get_queryset(), pk=pk)
+        return Response(self.get_serializer(survey).data, headers={'ETag': etag})
+
+    @action(detail=False, methods=['GET'])
+    def statistics(self, request):
+        # 설문 행이 아니라 미리 모아둔 SurveyStatistic 만 읽으므로, 비용은 그룹 수에만 비례합니다.
+        return Response(survey_statistics())
+
+    @action(detail=False, methods=['GET'])
+    def search(self, request):
+        # ?q=검색어 로 자유 응답을 전문 검색해, 잘 맞는 순서대로 설문 id 와 검색어 주변 발췌(snippets)를 돌려줍니다.
+        # 점수 순서는 커서로 이어 받을 수 없으므로 offset 으로 페이지를 나눕니다. (survey/search.py 참고)
+        serializer = SurveySearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        q, offset = serializer.validated_data['q'], serializer.validated_data['offset']
+        page_size = min(serializer.validated_data.get('page_size', settings.PAGE_SIZE), settings.MAX_PAGE_SIZE)
+
+        try:
+            # 다음 페이지가 있는지 알기 위해 하나 더 읽습니다.
+            hits = search_surveys(q, limit=page_size + 1, offset=offset)
+        except NotSupportedError as e:
+            return Response(status=status.HTTP_501_NOT_IMPLEMENTED, data=str(e))
+
+        url = request.build_absolute_uri()
+        previous = None
+        if offset:
+            previous = (replace_query_param(url, 'offset', offset - page_size) if offset > page_size
+                        else remove_query_param(url, 'offset'))
+        return Response({
+            'next': replace_query_param(url, 'offset', offset + page_size) if len(hits) > page_size else None,
+            'previous': previous,
+            'results': hits[:page_size],
+        })
 
     def create(self, request):
         # copy makes request.data mutable
@@ -54,5 +120,12 @@ class OperatingSystemViewSet(viewsets.GenericViewSet):
 @require_http_methods('GET')
 def top_50(request):
 
-    surveys = SurveyResult.objects.all()[:50]
-    return render(request, 'index.html', context={'surveys': surveys})
+    # 렌더링한 페이지는 새 설문이 들어올 때까지 캐시에서 꺼내 쓰고(survey/cache.py 참고),
+    # 브라우저가 가진 페이지가 그대로라면 본문 없이 304 로 응답합니다.
+    page = get_top_50_page(request)
+    response = get_conditional_response(request, etag=page['etag'], last_modified=page['last_modified'])
+    if response is None:
+        response = HttpResponse(page['content'])
+    response['ETag'] = page['etag']
+    response['Last-Modified'] = http_date(page['last_modified'])
+    return response
@@ -0,0 +1,113 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication, jwt_get_username_from_payload
+
+from common.db_router import use_primary
+from seminar.models import InstructorProfile, ParticipantProfile
+
+User = get_user_model()
+
+# 비밀번호 해시는 캐시에 남기지 않습니다. 캐시에서 만든 유저는 password 가 deferred 상태라
+# 필요할 때만 DB 에서 읽고, save() 해도 불러온 필드만 저장됩니다.
+USER_FIELDS = [field for field in User._meta.concrete_fields if field.attname != 'password']
+PROFILES = (
+    ('participant', ParticipantProfile, ('id', 'university', 'accepted')),
+    ('instructor', InstructorProfile, ('id', 'company', 'year')),
+)
+
+
+def user_version_key(user_id):
+    return f'auth:user:{user_id}:version'
+
+
+def user_cache_key(user_id, version, token):
+    # 토큰마다 캐시 키가 다르도록 토큰 전체의 해시를 씁니다.
+    token_hash = hashlib.sha256(token if isinstance(token, bytes) else token.encode()).hexdigest()
+    return f'auth:user:{user_id}:{version}:{token_hash}'
+
+
+def bump_user_version(user_id):
+    key = user_version_key(user_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def invalidate_user(user_id):
+    # 토큰마다 캐시 키가 다르므로, 버전을 올려 그 유저의 모든 캐시를 한 번에 무효화합니다.
+    bump_user_version(user_id)
+    # 트랜잭션이 커밋되기 전에 다른 요청이 새 버전으로 예전 값을 다시 캐시했을 수 있으므로, 커밋 후 한 번 더 올립니다.
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+def dump_user(user):
+    # redis 의 JSONSerializer 로도 저장할 수 있도록 dict 로 만듭니다. (datetime 은 문자열이 되었다가 load_user 에서 복원됩니다.)
+    data = {'user': {field.attname: field.value_from_object(user) for field in USER_FIELDS}}
+    for name, model, fields in PROFILES:
+        profile = getattr(user, name, None)
+        data[name] = {field: getattr(profile, field) for field in fields} if profile else None
+    return data
+
+
+def load_user(data):
+    user = User.from_db('default', [field.attname for field in USER_FIELDS],
+                        [field.to_python(data['user'][field.attname]) for field in USER_FIELDS])
+    for name, model, fields in PROFILES:
+        related = getattr(User, name).related
+        if data[name] is None:
+            # hasattr(user, 'participant') 가 쿼리 없이 False 가 되도록 '없음'을 캐시해둡니다.
+            related.set_cached_value(user, None)
+        else:
+            profile = model(user_id=user.id, **data[name])
+            profile._state.adding = False
+            setattr(user, name, profile)
+    return user
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+
+    # 매 요청마다 토큰의 유저를 DB 에서 다시 읽는 대신, 유저와 프로필 정보를 짧게(AUTH_USER_CACHE_TIMEOUT) 캐시합니다.
+    # 유저나 프로필이 저장되면 user/signals.py 에서 invalidate_user 로 무효화합니다.
+
+    def authenticate(self, request):
+        # 캐시 키에 쓸 토큰을 기억해둡니다. (인증 객체는 요청마다 새로 만들어집니다.)
+        self.jwt_value = self.get_jwt_value(request)
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, payload):
+        username = jwt_get_username_from_payload(payload)
+        user_id = payload.get('user_id')
+        if not username or user_id is None:
+            raise exceptions.AuthenticationFailed(_('Invalid payload.'))
+
+        version = cache.get(user_version_key(user_id), 0)
+        key = user_cache_key(user_id, version, self.jwt_value)
+
+        data = cache.get(key)
+        if data is not None:
+            user = load_user(data)
+            # 이메일이 바뀐 뒤의 예전 토큰은 기존과 마찬가지로 거부되도록 DB 에서 다시 확인합니다.
+            if user.get_username() == username:
+                return user
+
+        try:
+            # 캐시에 넣을 값이고, 방금 가입한 유저도 바로 인증되어야 하므로 primary 에서 읽습니다.
+            with use_primary():
+                user = User.objects.select_related('participant', 'instructor').get(**{User.USERNAME_FIELD: username})
+        except User.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid signature.'))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User account is disabled.'))
+
+        if user.id == user_id:
+            cache.set(key, dump_user(user), timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
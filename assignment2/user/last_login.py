@@ -0,0 +1,94 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.db.models.functions import Greatest
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+
+    # 로그인마다 유저 행을 UPDATE 하는 대신 last_login 을 메모리에 모아두었다가,
+    # flush_interval 초가 지나거나 max_entries 명이 모이면 한 번의 UPDATE 로 반영합니다. (write-behind)
+    # 한 유저가 여러 번 로그인하면 가장 늦은 시각만 남깁니다.
+
+    def __init__(self, flush_interval, max_entries):
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._pending = {}
+        self._lock = threading.Lock()
+        # 같은 유저 행을 두고 flush 끼리 경합하지 않도록 flush 는 하나씩만 실행합니다.
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def add(self, user_id, timestamp):
+        with self._lock:
+            if user_id not in self._pending or self._pending[user_id] < timestamp:
+                self._pending[user_id] = timestamp
+            full = len(self._pending) >= self.max_entries
+            if not full:
+                self._schedule()
+
+        if full:
+            self.flush()
+
+    def _schedule(self):
+        # self._lock 을 잡은 상태에서 호출합니다.
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+
+            if not pending:
+                return 0
+
+            try:
+                # 여러 스레드가 찍은 시각이 순서대로 들어오지 않을 수 있으므로, 이미 더 늦은 시각이 있으면 두고 갑니다.
+                get_user_model().objects.filter(id__in=pending).update(last_login=Greatest('last_login', Case(
+                    *[When(id=user_id, then=Value(timestamp)) for user_id, timestamp in pending.items()],
+                    output_field=DateTimeField()
+                )))
+            except Exception:
+                # 반영하지 못한 시각은 버리지 않고 다음 flush 때 다시 시도합니다.
+                with self._lock:
+                    for user_id, timestamp in pending.items():
+                        if user_id not in self._pending or self._pending[user_id] < timestamp:
+                            self._pending[user_id] = timestamp
+                    self._schedule()
+                raise
+            return len(pending)
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('last_login 을 반영하지 못했습니다.')
+        finally:
+            # 타이머 스레드가 연 DB 커넥션은 스스로 닫아야 합니다.
+            connection.close()
+
+    def shutdown(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('종료 중에 last_login 을 반영하지 못했습니다.')
+
+
+last_login_buffer = LastLoginBuffer(
+    flush_interval=settings.LAST_LOGIN_FLUSH_INTERVAL,
+    max_entries=settings.LAST_LOGIN_FLUSH_SIZE,
+)
+atexit.register(last_login_buffer.shutdown)
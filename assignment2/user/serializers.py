@@ -1,12 +1,17 @@
 from abc import ABC
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.hashers import make_password
-from django.contrib.auth.models import update_last_login
-from django.db import transaction, models
+from django.db import IntegrityError, transaction, models
+from django.db.models import Count, Max
+from django.utils import timezone
 from rest_framework import serializers, status
 from rest_framework_jwt.settings import api_settings
 
-from seminar.models import ParticipantProfile
+from seminar.models import InstructorProfile, ParticipantProfile
+from user.last_login import last_login_buffer
 from seminar.serializers import InstructorSerializer, ParticipantSerializer, InstructorSeminarSerializer, \
     ParticipantSeminarSerializer
 
@@ -47,7 +52,8 @@ class UserCreateSerializer(serializers.Serializer):
     company = serializers.CharField(required=False)
     year = serializers.IntegerField(required=False)
 
-    def build_profile(self, user, validated_data):
+    @staticmethod
+    def profile_serializer_of(validated_data, user=None):
         role = validated_data['role']
         profile, serializer = {}, None
         if role == UserRole.PARTICIPANT:
@@ -61,10 +67,13 @@ class UserCreateSerializer(serializers.Serializer):
             year = validated_data.get('year')
             profile.update({'company': company, 'year': year})
 
-        sz = serializer(data=profile, partial=True, context={'user': user})
+        return serializer(data=profile, partial=True, context={'user': user})
+
+    def build_profile(self, user, validated_data):
+        sz = self.profile_serializer_of(validated_data, user)
         sz.is_valid(raise_exception=True)
         sz.save()
-        return profile
+        return sz.initial_data
 
     def validate(self, data):
         first_name = data.get('first_name')
@@ -106,7 +115,8 @@ class UserLoginSerializer(serializers.Serializer):
         if user is None:
             raise serializers.ValidationError("이메일 또는 비밀번호가 잘못되었습니다.")
 
-        update_last_login(None, user)
+        # 로그인이 몰릴 때 유저 행 UPDATE 가 수강 신청과 경합하지 않도록, 모아서 한 번에 반영합니다.
+        last_login_buffer.add(user.id, timezone.now())
         return {
             'email': user.email,
             'token': jwt_token_of(user)
@@ -144,6 +154,19 @@ class UserSerializer(serializers.ModelSerializer):
         )
         extra_kwargs = {'password': {'write_only': True, 'required': False}, 'last_login': {'read_only': True}}
 
+    @staticmethod
+    def etag_fields(prefix=''):
+        # 상세 응답을 결정하는 값들입니다. (common/conditional.py 참고) SurveyResultSerializer 에서는 prefix='user__' 로 씁니다.
+        # User 에는 updated_at 이 없고, 프로필은 save(update_fields=...) 로 고쳐 updated_at 이 바뀌지 않으므로 값을 그대로 봅니다.
+        fields = ('id', 'username', 'email', 'first_name', 'last_name', 'last_login', 'date_joined',
+                  'participant__id', 'participant__university', 'participant__accepted',
+                  'instructor__id', 'instructor__company', 'instructor__year')
+        return tuple(prefix + field for field in fields), {
+            'user_seminars_updated_at': Max(f'{prefix}user_seminars__updated_at'),
+            'user_seminars_seminar_updated_at': Max(f'{prefix}user_seminars__seminar__updated_at'),
+            'user_seminars_count': Count(f'{prefix}user_seminars'),
+        }
+
     def validate_password(self, value):
 
         return make_password(value)
@@ -175,6 +198,14 @@ class UserSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("year; 양의 정수만 가능합니다.")
         return super().validate(data)
 
+    def user_seminars_of(self, instance, is_instructor):
+
+        # UserViewSet 에서 user_seminars__seminar 를 prefetch 해두었다면 추가 쿼리 없이 메모리에서 거릅니다.
+        if 'user_seminars' in getattr(instance, '_prefetched_objects_cache', {}):
+            return [user_seminar for user_seminar in instance.user_seminars.all()
+                    if user_seminar.is_instructor == is_instructor]
+        return list(instance.user_seminars.filter(is_instructor=is_instructor).select_related('seminar').order_by('id'))
+
     def get_participant(self, instance):
 
         if hasattr(instance, 'participant'):
@@ -182,7 +213,7 @@ class UserSerializer(serializers.ModelSerializer):
         else:
             return None
         data = ParticipantSerializer(profile).data
-        seminars = ParticipantSeminarSerializer(list(instance.user_seminars.filter(is_instructor=False)),
+        seminars = ParticipantSeminarSerializer(self.user_seminars_of(instance, is_instructor=False),
                                                 many=True).data
         data['seminars'] = seminars
         return data
@@ -195,7 +226,7 @@ class UserSerializer(serializers.ModelSerializer):
             return None
         data = InstructorSerializer(profile).data
 
-        charge = instance.user_seminars.filter(is_instructor=True).first()
+        charge = next(iter(self.user_seminars_of(instance, is_instructor=True)), None)
         data['charge'] = InstructorSeminarSerializer(charge).data if charge else None
         return data
 
@@ -246,3 +277,87 @@ class CreateParticipantProfileService(serializers.Serializer):
         return status.HTTP_201_CREATED, UserSerializer(user).data
 
 
+def hash_passwords(passwords):
+    # 비밀번호 해시(PBKDF2)는 CPU 를 많이 쓰므로, 여러 명을 한 번에 가입시킬 때는 워커 프로세스에 나눠서 계산합니다.
+    workers = min(settings.BULK_SIGNUP_HASH_WORKERS, len(passwords))
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+class BulkSignUpService(serializers.Serializer):
+
+    # 한 기수를 한 번에 가입시킵니다. 행마다 UserCreateSerializer 와 같은 검증을 거친 뒤,
+    # 통과한 행만 한 트랜잭션 안에서 유저와 프로필을 각각 bulk_create 로 넣고 행마다 결과와 토큰을 돌려줍니다.
+    # NOTE: bulk_create 는 post_save 시그널을 보내지 않지만, 새로 만든 유저는 무효화할 캐시가 없습니다.
+
+    users = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_users(self, value):
+        if len(value) > settings.BULK_SIGNUP_MAX_SIZE:
+            raise serializers.ValidationError(f'한 번에 {settings.BULK_SIGNUP_MAX_SIZE}명까지 가입시킬 수 있습니다.')
+        return value
+
+    def validate_row(self, row):
+        sz = UserCreateSerializer(data=row)
+        if not sz.is_valid():
+            return None, sz.errors
+        profile = UserCreateSerializer.profile_serializer_of(sz.validated_data)
+        if not profile.is_valid():
+            return None, profile.errors
+        return (sz.validated_data, profile), None
+
+    def execute(self):
+        self.is_valid(raise_exception=True)
+        rows = self.validated_data['users']
+
+        results, valid = [], []
+        for index, row in enumerate(rows):
+            data, errors = self.validate_row(row)
+            if errors:
+                results.append({'index': index, 'email': row.get('email'), 'status': status.HTTP_400_BAD_REQUEST, 'errors': errors})
+                continue
+            email = User.objects.normalize_email(data[0]['email'])
+            results.append({'index': index, 'email': email})
+            valid.append((results[-1], data))
+
+        # 이미 가입된 이메일과, 요청 안에서 두 번 이상 나온 이메일(처음 것만 가입)은 409 로 돌려줍니다.
+        emails = {result['email'] for result, _ in valid}
+        taken = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        signups = []
+        for result, data in valid:
+            if result['email'] in taken:
+                result.update({'status': status.HTTP_409_CONFLICT, 'errors': '이미 존재하는 유저 이메일입니다.'})
+                continue
+            taken.add(result['email'])
+            signups.append((result, data))
+
+        if not signups:
+            return status.HTTP_400_BAD_REQUEST, {'created': 0, 'results': results}
+
+        passwords = hash_passwords([validated_data['password'] for _, (validated_data, _) in signups])
+        users = [User(email=result['email'], username=validated_data['username'], password=password,
+                      first_name=validated_data.get('first_name', ''), last_name=validated_data.get('last_name', ''))
+                 for (result, (validated_data, _)), password in zip(signups, passwords)]
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                # SQLite, MySQL 에서는 bulk_create 가 pk 를 채워주지 않으므로 이메일로 다시 읽어옵니다.
+                ids = dict(User.objects.filter(email__in=[user.email for user in users]).values_list('email', 'id'))
+                participants, instructors = [], []
+                for user, (_, (_, profile)) in zip(users, signups):
+                    user.id = ids[user.email]
+                    model = profile.Meta.model
+                    (participants if model is ParticipantProfile else instructors).append(
+                        model(user=user, **profile.validated_data))
+                ParticipantProfile.objects.bulk_create(participants)
+                InstructorProfile.objects.bulk_create(instructors)
+        except IntegrityError:
+            # 검사한 뒤 다른 요청이 같은 이메일로 먼저 가입한 경우입니다. 아무것도 넣지 않았으므로 그대로 다시 요청하면 됩니다.
+            return status.HTTP_409_CONFLICT, '이미 존재하는 유저 이메일이 있습니다. 다시 시도해주세요.'
+
+        for user, (result, _) in zip(users, signups):
+            result.update({'status': status.HTTP_201_CREATED, 'id': user.id, 'token': jwt_token_of(user)})
+        return status.HTTP_201_CREATED, {'created': len(users), 'results': results}
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from seminar.models import InstructorProfile, ParticipantProfile
+from user.authentication import invalidate_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_on_user_change(sender, instance, **kwargs):
+    invalidate_user(instance.id)
+
+
+@receiver(post_save, sender=ParticipantProfile)
+@receiver(post_save, sender=InstructorProfile)
+@receiver(post_delete, sender=ParticipantProfile)
+@receiver(post_delete, sender=InstructorProfile)
+def invalidate_user_on_profile_change(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
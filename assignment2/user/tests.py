@@ -1,10 +1,20 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 
 
 # Create your tests here.
 from rest_framework import status
 
+from django.utils import timezone
+
+from seminar.models import InstructorProfile, ParticipantProfile, Seminar, UserSeminar
+from user.last_login import LastLoginBuffer, last_login_buffer
 from user.models import User
+from user.serializers import jwt_token_of
 from user.test_user import UserFactory
 
 
@@ -36,11 +46,17 @@ class UserTestCase(TestCase):
 
     def test_login(self):
         data = {'email': 'test@test.com', 'password': 'test'}
+        last_login = User.objects.get(email='test@test.com').last_login
         response = self.client.post('/api/v1/login/', data=data)
 
         self.assertContains(response, 'token', status_code=status.HTTP_200_OK)
         self.assertTrue(response.data['success'])
 
+        # last_login 은 바로 쓰지 않고 모아두었다가 flush 때 반영됩니다.
+        self.assertEqual(User.objects.get(email='test@test.com').last_login, last_login)
+        self.assertEqual(last_login_buffer.flush(), 1)
+        self.assertGreater(User.objects.get(email='test@test.com').last_login, last_login)
+
     def test_profile_get(self):
 
         client = self.client
@@ -55,6 +71,60 @@ class UserTestCase(TestCase):
         response = client.get(f'/api/v1/user/{user.id}/')
         self.assertEqual(response.data['email'], 'instructor@test.com')
 
+        response = client.get('/api/v1/user/abc/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_profile_get_쿼리수_고정(self):
+
+        client = self.client
+        client.force_login(self.user)
+
+        def join_seminars(n):
+            Seminar.objects.bulk_create(
+                Seminar(name=f'세미나{i}', capacity=100, time=timezone.now().time()) for i in range(n)
+            )
+            UserSeminar.objects.bulk_create(
+                UserSeminar(user=self.user, seminar=seminar)
+                for seminar in Seminar.objects.exclude(user_seminars__user=self.user)
+            )
+
+        for total in (1, 50):
+            join_seminars(total - self.user.user_seminars.count())
+
+            # 세션 + 유저(인증) + ETag + 유저와 프로필 + 참여 세미나 prefetch
+            with self.assertNumQueries(5):
+                response = client.get('/api/v1/user/me/')
+            self.assertEqual(len(response.data['participant']['seminars']), total)
+            self.assertEqual(response.data['participant']['seminars'][0]['name'], '세미나0')
+
+    def test_profile_get_조건부_요청(self):
+        client = self.client
+        client.force_login(self.user)
+        seminar = Seminar.objects.create(name='세미나', capacity=10, time=timezone.now().time())
+
+        response = client.get('/api/v1/user/me/')
+        etag = response['ETag']
+
+        # 세션 + 유저(인증) + ETag 만 읽고 304 를 돌려줍니다.
+        with self.assertNumQueries(3):
+            response = client.get('/api/v1/user/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # 프로필을 고치거나(updated_at 은 그대로), 세미나에 참여하면 ETag 가 바뀝니다.
+        client.put('/api/v1/user/me/', data={'university': '서울대학교'}, content_type='application/json')
+        response = client.get('/api/v1/user/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        UserSeminar.objects.create(user=self.user, seminar=seminar)
+        response = client.get('/api/v1/user/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['participant']['seminars']), 1)
+
+        response = client.get('/api/v1/user/0/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_profile_update(self):
         user = User.objects.get(email='test@test.com')
 
@@ -83,5 +153,203 @@ class UserTestCase(TestCase):
         self.assertEqual(response.data['participant']['university'], '연세대학교')
 
 
+class CachedJWTAuthenticationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory(email='test@test.com', username='test', password='test', is_instructor=True)
+        cls.seminar = Seminar.objects.create(name='세미나', capacity=10, time=timezone.now().time())
+
+    def setUp(self):
+        # 앞선 테스트가 같은 id 의 유저를 캐시에 남겼을 수 있습니다.
+        cache.clear()
+        self.token = 'JWT ' + jwt_token_of(self.user)
+
+    def get_seminar(self):
+        return self.client.get(f'/api/v1/seminar/{self.seminar.id}/', HTTP_AUTHORIZATION=self.token)
+
+    def test_인증_유저_캐시(self):
+        self.get_seminar()
+
+        # 세미나 응답도, 토큰의 유저도 캐시에 있으므로 쿼리가 나가지 않습니다.
+        with self.assertNumQueries(0):
+            response = self.get_seminar()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_유저_수정시_무효화(self):
+        self.get_seminar()
+
+        response = self.client.put('/api/v1/user/me/', data={'username': 'changed'},
+                                   content_type='application/json', HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.data['username'], 'changed')
+
+        with self.assertNumQueries(1):
+            self.get_seminar()
+
+        # 이메일이 바뀌면 예전 토큰은 캐시에 있더라도 더 이상 쓸 수 없습니다.
+        self.client.put('/api/v1/user/me/', data={'email': 'changed@test.com'},
+                        content_type='application/json', HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(self.get_seminar().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_커밋_후_한번_더_무효화(self):
+        self.get_seminar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'changed'
+            self.user.save()
+            # 커밋 전에 다른 요청이 유저를 다시 캐시한 경우입니다.
+            self.get_seminar()
+
+        with self.assertNumQueries(1):
+            self.get_seminar()
+
+    def test_프로필_생성시_무효화(self):
+        response = self.client.post(f'/api/v1/seminar/{self.seminar.id}/user/', data={'role': 'participant'},
+                                    HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.post('/api/v1/user/participant/', data={'university': '서울대학교'},
+                                    HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(f'/api/v1/seminar/{self.seminar.id}/user/', data={'role': 'participant'},
+                                    HTTP_AUTHORIZATION=self.token)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class BulkSignUpTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = UserFactory(email='staff@test.com', username='staff', password='staff', is_staff=True)
+        cls.user = UserFactory(email='taken@test.com', username='taken', password='taken')
+
+    def setUp(self):
+        # 다른 테스트가 남긴 인증 캐시에 따라 쿼리 수가 달라지지 않게 합니다.
+        cache.clear()
+
+    def bulk_signup(self, users, user=None):
+        return self.client.post('/api/v1/signup/bulk/', data={'users': users}, content_type='application/json',
+                                HTTP_AUTHORIZATION='JWT ' + jwt_token_of(user or self.staff))
+
+    def test_스태프만_가능(self):
+        response = self.bulk_signup([{'username': 'a', 'role': 'participant', 'email': 'a@test.com', 'password': 'a'}],
+                                    user=self.user)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(BULK_SIGNUP_HASH_WORKERS=2)
+    def test_일괄_가입(self):
+        users = [{'username': f'user{i}', 'role': 'participant', 'email': f'user{i}@test.com', 'password': f'pw{i}',
+                  'university': '서울대학교'} for i in range(4)]
+        users += [
+            {'username': 'inst', 'role': 'instructor', 'email': 'inst@test.com', 'password': 'pw', 'company': '와플',
+             'year': 3},
+            {'username': 'bad', 'role': 'participant', 'email': 'bad@test.com', 'password': 'pw', 'first_name': 'a'},
+            {'username': 'taken', 'role': 'participant', 'email': 'taken@test.com', 'password': 'pw'},
+            {'username': 'dup', 'role': 'participant', 'email': 'user0@test.com', 'password': 'pw'},
+        ]
+        response = self.bulk_signup(users)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 5)
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [201] * 5 + [400, 409, 409])
+        self.assertEqual([result['index'] for result in results], list(range(8)))
+
+        participant = User.objects.get(email='user1@test.com')
+        self.assertEqual(participant.id, results[1]['id'])
+        self.assertTrue(participant.check_password('pw1'))
+        self.assertEqual(participant.participant.university, '서울대학교')
+        self.assertTrue(participant.participant.accepted)
+        instructor = User.objects.get(email='inst@test.com')
+        self.assertEqual((instructor.instructor.company, instructor.instructor.year), ('와플', 3))
+        self.assertFalse(hasattr(instructor, 'participant'))
+        self.assertFalse(User.objects.filter(email='bad@test.com').exists())
+
+        # 돌려준 토큰으로 바로 로그인한 것처럼 쓸 수 있습니다.
+        response = self.client.get('/api/v1/user/me/', HTTP_AUTHORIZATION='JWT ' + results[4]['token'])
+        self.assertEqual(response.data['email'], 'inst@test.com')
+        self.assertEqual(response.data['instructor']['company'], '와플')
+
+    def test_일괄_가입_쿼리수(self):
+        users = [{'username': f'user{i}', 'role': 'instructor' if i % 2 else 'participant',
+                  'email': f'user{i}@test.com', 'password': 'pw'} for i in range(50)]
+        # 인증, 이메일 중복 확인, 유저 insert, id 조회, 프로필 insert 두 번 (+ savepoint)
+        with self.assertNumQueries(8):
+            response = self.bulk_signup(users)
+        self.assertEqual(response.data['created'], 50)
+        self.assertEqual(ParticipantProfile.objects.filter(user__email__startswith='user').count(), 25)
+        self.assertEqual(InstructorProfile.objects.filter(user__email__startswith='user').count(), 25)
+
+    def test_모두_실패(self):
+        response = self.bulk_signup([{'username': 'taken', 'role': 'participant', 'email': 'taken@test.com',
+                                      'password': 'pw'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], 0)
+
+        response = self.bulk_signup([])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LastLoginBufferTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [UserFactory(email=f'user{i}@test.com', username=f'user{i}') for i in range(3)]
+
+    def test_최대_개수_도달시_한번에_반영(self):
+        buffer = LastLoginBuffer(flush_interval=60, max_entries=3)
+        now = timezone.now()
+
+        with self.assertNumQueries(0):
+            buffer.add(self.users[0].id, now)
+            buffer.add(self.users[1].id, now)
+            buffer.add(self.users[0].id, now + timedelta(seconds=1))
+
+        with self.assertNumQueries(1):
+            buffer.add(self.users[2].id, now)
+
+        self.assertEqual(User.objects.get(id=self.users[0].id).last_login, now + timedelta(seconds=1))
+        self.assertEqual(User.objects.get(id=self.users[2].id).last_login, now)
+        self.assertEqual(buffer.flush(), 0)
+
+
+class LastLoginBufferConcurrencyTestCase(TransactionTestCase):
+
+    n_users = 20
+    n_threads = 8
+    n_logins = 50
+
+    def setUp(self):
+        User.objects.bulk_create(
+            User(email=f'user{i}@test.com', username=f'user{i}') for i in range(self.n_users)
+        )
+        self.user_ids = list(User.objects.values_list('id', flat=True))
+
+    def test_동시_로그인_시각_유실_없음(self):
+        # 개수와 시간 조건으로 여러 스레드에서 flush 가 겹쳐 일어나도, 유저마다 가장 늦은 로그인 시각이 남아야 합니다.
+        buffer = LastLoginBuffer(flush_interval=0.01, max_entries=7)
+        start = timezone.now()
+        expected = {}
+        lock = threading.Lock()
+
+        def login(n):
+            try:
+                for i in range(self.n_logins):
+                    user_id = self.user_ids[(n * self.n_logins + i) % self.n_users]
+                    timestamp = start + timedelta(microseconds=n * self.n_logins + i)
+                    with lock:
+                        expected[user_id] = max(expected.get(user_id, timestamp), timestamp)
+                    buffer.add(user_id, timestamp)
+            finally:
+                connection.close()
 
+        threads = [threading.Thread(target=login, args=(n, )) for n in range(self.n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 종료 시 flush 와 같습니다.
+        buffer.shutdown()
 
+        self.assertEqual(dict(User.objects.values_list('id', 'last_login')), expected)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
-from .views import UserViewSet, UserSignUpView, UserLoginView, LogInView
+from .views import UserViewSet, UserSignUpView, UserBulkSignUpView, UserLoginView, LogInView
 
 from survey import views
 router = SimpleRouter()
@@ -8,6 +8,7 @@ router.register('user', UserViewSet, basename='user')  # /api/v1/user/
 
 urlpatterns = [
     path('signup/', UserSignUpView.as_view(), name='signup'),  # /api/v1/signup/
+    path('signup/bulk/', UserBulkSignUpView.as_view(), name='signup-bulk'),  # /api/v1/signup/bulk/
     path('login/', UserLoginView.as_view(), name='login'),  # /api/v1/login/
     path('easy_login/', LogInView.as_view()),
     path('', include(router.urls), name='auth-user')
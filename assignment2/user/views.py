@@ -1,13 +1,19 @@
 import rest_framework
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.db import IntegrityError
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
 from rest_framework import status, viewsets, permissions
 from rest_framework.views import APIView
 from rest_framework_jwt.serializers import JSONWebTokenSerializer
 from rest_framework_jwt.views import ObtainJSONWebToken
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from user.serializers import UserSerializer, UserLoginSerializer, UserCreateSerializer, CreateParticipantProfileService
+from common.conditional import etag_for, not_modified, object_id
+from common.db_router import pin_user
+from seminar.models import UserSeminar
+from user.serializers import UserSerializer, UserLoginSerializer, UserCreateSerializer, CreateParticipantProfileService, \
+    BulkSignUpService
 
 User = get_user_model()
 
@@ -26,9 +32,20 @@ class UserSignUpView(APIView):
         except IntegrityError:
             return Response(status=status.HTTP_409_CONFLICT, data='이미 존재하는 유저 이메일입니다.')
 
+        # 새 토큰으로 보내는 다음 요청들도 방금 만든 유저를 읽을 수 있게 합니다. (common/db_router.py 참고)
+        pin_user(user.id)
         return Response({'user': user.email, 'token': jwt_token}, status=status.HTTP_201_CREATED)
 
 
+class UserBulkSignUpView(APIView):
+    permission_classes = (permissions.IsAdminUser, )
+
+    def post(self, request, *args, **kwargs):
+        service = BulkSignUpService(data=request.data, context={'request': request})
+        status_code, data = service.execute()
+        return Response(status=status_code, data=data)
+
+
 class UserLoginView(APIView):
     permission_classes = (permissions.AllowAny, )
 
@@ -47,11 +64,18 @@ class UserViewSet(viewsets.GenericViewSet):
     serializer_class = UserSerializer
     queryset = User.objects.all()
 
+    def get_queryset(self):
+        # 프로필은 join 으로, 참여 중인 세미나는 prefetch 한 번으로 가져와
+        # 참여한 세미나 수와 상관없이 쿼리 수가 일정하도록 합니다. (UserSerializer.user_seminars_of 참고)
+        return super().get_queryset().select_related('participant', 'instructor').prefetch_related(
+            Prefetch('user_seminars', queryset=UserSeminar.objects.select_related('seminar').order_by('id'))
+        )
+
     def update(self, request, pk=None):
         if pk != 'me':
             return Response(status=status.HTTP_403_FORBIDDEN, data='다른 유저 정보를 수정할 수 없습니다.')
 
-        user = request.user
+        user = self.get_queryset().get(pk=request.user.pk)
 
         serializer = self.get_serializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
@@ -63,8 +87,14 @@ class UserViewSet(viewsets.GenericViewSet):
         if request.user.is_anonymous:
             return Response(status=status.HTTP_403_FORBIDDEN, data='먼저 로그인 하세요.')
 
-        user = request.user if pk == 'me' else self.get_object()
-        return Response(self.get_serializer(user).data)
+        pk = request.user.pk if pk == 'me' else object_id(pk)
+        # 클라이언트가 가진 응답이 그대로라면 작은 쿼리 한 번으로 304 를 돌려줍니다. (common/conditional.py 참고)
+        etag = etag_for(User.objects.filter(pk=pk), *UserSerializer.etag_fields())
+        if (response := not_modified(request, etag)) is not None:
+            return response
+
+        user = get_object_or_404(self.get_queryset(), pk=pk)
+        return Response(self.get_serializer(user).data, headers={'ETag': etag})
 
     @action(detail=False, methods=['POST'])
     def participant(self, request):
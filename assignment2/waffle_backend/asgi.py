@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'waffle_backend.settings')
 
+# uvicorn waffle_backend.asgi:application 등으로 띄웁니다.
+# 읽기 엔드포인트는 settings.ASGI_URLCONF 의 async view 가 받습니다. (common/async_views.py 참고)
 application = get_asgi_application()
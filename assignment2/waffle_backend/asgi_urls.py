@@ -0,0 +1,18 @@
+"""waffle_backend URL Configuration for ASGI
+
+ASGI 로 받은 요청은 common.middleware.AsgiUrlconfMiddleware 가 이 URLconf 로 보냅니다.
+읽기가 많은 엔드포인트는 async view 로 받고, 나머지는 waffle_backend/urls.py 를 그대로 따릅니다.
+"""
+from django.urls import path
+
+from common.async_views import async_read_view
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/v1/seminar/', async_read_view),
+    path('api/v1/seminar/<int:pk>/', async_read_view),
+    path('api/v1/survey/', async_read_view),
+    path('api/v1/survey/<int:pk>/', async_read_view),
+    path('api/v1/os/', async_read_view),
+] + sync_urlpatterns
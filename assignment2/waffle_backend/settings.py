@@ -12,8 +12,11 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 
 import datetime
 import os
+import sys
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 
@@ -26,6 +29,7 @@ SECRET_KEY = '0^k@b1ln%g7l_*6xr*&5&vhgp7r$i&n-db#_!(8*a$n2y1hf4='
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 DEBUG_TOOLBAR = os.getenv('DEBUG_TOOLBAR') in ('true', 'True')
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION') in ('true', 'True')
 
 ALLOWED_HOSTS = []
 
@@ -52,6 +56,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.middleware.AsgiUrlconfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +71,10 @@ if DEBUG_TOOLBAR:
     MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
     INTERNAL_IPS = ['127.0.0.1', ]
 
+if QUERY_INSTRUMENTATION:
+    # 요청별 쿼리 수, DB 시간을 Server-Timing 헤더와 'waffle_backend.performance' 로그로 남깁니다.
+    MIDDLEWARE.insert(0, 'common.middleware.QueryInstrumentationMiddleware')
+
 ROOT_URLCONF = 'waffle_backend.urls'
 
 TEMPLATES = [
@@ -86,6 +95,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'waffle_backend.wsgi.application'
 
+# ASGI(waffle_backend/asgi.py)로 받은 요청의 URLconf 와, 그 읽기 view 들이 ORM 을 실행할 스레드 수 (common/async_views.py 참고)
+ASGI_URLCONF = 'waffle_backend.asgi_urls'
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', 10))
+
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
@@ -97,9 +110,27 @@ DATABASES = {
         'NAME': 'waffle_backend_2',  # database name 변경
         'USER': 'waffle-backend',
         'PASSWORD': 'seminar',
+        # 동시성 테스트(여러 스레드가 각자 커넥션을 여는 경우)를 위해 테스트 DB 도 파일로 만듭니다.
+        # sqlite 의 공유 메모리 DB 는 다른 커넥션이 쓰는 중이면 기다리지 않고 바로 'table is locked' 에러를 냅니다.
+        'TEST': {'NAME': 'test_waffle_backend_2'},
+        # sqlite 는 쓰기를 한 커넥션씩만 하므로, 쓰기가 몰리면 잠금을 기다리다 기본 5초를 넘겨 'database is locked' 가 납니다.
+        'OPTIONS': {'timeout': 30},
     }
 }
 
+# 읽기 전용 복제 DB. DATABASE_REPLICA_HOSTS=10.0.0.2,10.0.0.3 처럼 주면 default 에서 HOST 만 바꾼 replica1, replica2 ... 가 생기고,
+# 안전한(GET 등) 요청의 읽기가 그중 하나로 갑니다. 쓰기에 성공한 유저의 읽기는 READ_AFTER_WRITE_PIN_SECONDS 동안 default 로 갑니다.
+# (common/db_router.py 참고)
+for i, host in enumerate(filter(None, os.getenv('DATABASE_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{i}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['common.db_router.PrimaryReplicaRouter']
+READ_AFTER_WRITE_PIN_SECONDS = 5
+
+if REPLICA_DATABASES:
+    MIDDLEWARE.append('common.middleware.ReplicaRoutingMiddleware')
+
 # You should clarify which field type to use when auto-creating primary keys; Since Django 3.2
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
@@ -152,11 +183,16 @@ REST_FRAMEWORK = {
     ),
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-       'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
+       'user.authentication.CachedJSONWebTokenAuthentication',
        'rest_framework.authentication.SessionAuthentication'
     ),
 }
 
+# 목록 API 의 기본 페이지 크기와 클라이언트가 ?page_size= 로 요청할 수 있는 최대 페이지 크기 (common/pagination.py 참고)
+# 페이지네이션은 목록 API 별로 pagination_class 를 지정하므로, DRF 전역 PAGE_SIZE 대신 여기에 둡니다.
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
 # 밑은 인증 구현을 위한 기반
 
 # 아래는 JWT 모듈 설정입니다.
@@ -176,16 +212,67 @@ JWT_AUTH = {
 # Custom User Model
 AUTH_USER_MODEL = 'user.User'
 
+# JWT 인증 시 유저와 프로필 정보를 캐시해두는 시간(초). 유저나 프로필이 저장되면 그 전에 지워집니다. (user/authentication.py 참고)
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# 로그인 시각(last_login)은 모아두었다가 이 시간(초)이 지나거나 이만큼 모이면 한 번에 반영합니다. (user/last_login.py 참고)
+LAST_LOGIN_FLUSH_INTERVAL = 5
+LAST_LOGIN_FLUSH_SIZE = 100
+
+# 일괄 가입(/api/v1/signup/bulk/) 한 번에 받을 최대 인원과, 비밀번호 해시를 나눠 계산할 워커 프로세스 수
+BULK_SIGNUP_MAX_SIZE = 500
+BULK_SIGNUP_HASH_WORKERS = int(os.getenv('BULK_SIGNUP_HASH_WORKERS', os.cpu_count() or 1))
+
 SITE_ID = 3
 
 
-CACHES = {
-    "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": 'redis://localhost:6379/0',
-        "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
-            "SERIALIZER": "django_redis.serializers.json.JSONSerializer",
-        }
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
     },
-}
\ No newline at end of file
+    'loggers': {
+        'waffle_backend.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
+# 캐시는 redis 를 씁니다. 시그널로 지우는 캐시(세미나 상세, 인증 유저, top_50)는 모든 프로세스가 같은 캐시를 봐야 바로 무효화됩니다.
+# 프로세스 메모리 캐시는 테스트나, LOCMEM_CACHE=true 로 명시한 로컬 단일 프로세스에서만 씁니다.
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+TESTING = sys.argv[1:2] == ['test']
+LOCMEM_CACHE = TESTING or os.getenv('LOCMEM_CACHE') in ('true', 'True')
+
+if not LOCMEM_CACHE:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SERIALIZER": "django_redis.serializers.json.JSONSerializer",
+            }
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# 쓰기 후 primary 고정(READ_AFTER_WRITE_PIN_SECONDS)은 캐시에 두므로, 복제 DB 를 쓰면 모든 프로세스가 같은 캐시를 봐야 합니다.
+# 프로세스마다 따로인 캐시로는 다음 요청이 다른 프로세스로 가면 고정이 풀리므로 시작할 때 막습니다. (테스트는 한 프로세스입니다.)
+if REPLICA_DATABASES and LOCMEM_CACHE and not TESTING:
+    raise ImproperlyConfigured('복제 DB(DATABASE_REPLICA_HOSTS)를 쓰려면 여러 프로세스가 함께 보는 캐시(redis)가 필요합니다. '
+                               'LOCMEM_CACHE 를 끄세요.')
+
+# 세미나 상세 응답 캐시 유지 시간(초). 세미나나 수강 정보가 바뀌면 그 전에 지워집니다. (seminar/cache.py 참고)
+SEMINAR_CACHE_TIMEOUT = 60 * 10
\ No newline at end of file